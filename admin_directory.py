@@ -0,0 +1,169 @@
+import os
+import threading
+import time
+from bisect import insort
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from azure.data.tables import TableClient
+
+# --------------------------------------------------------------------------------
+# ADMIN DIRECTORY (roster cache with a TTL and Timestamp-based incremental refresh)
+# --------------------------------------------------------------------------------
+# Once the TTL has passed, the next reader asks the table only for admins whose
+# Timestamp moved since the last read. Meanwhile other readers keep using the
+# current copy without waiting. Deleted rows don't show up in a Timestamp query,
+# so the roster is re-read in full every FULL_REFRESH_INTERVAL. Whatever the
+# dialog and the notification email need is worked out once per roster change:
+# the sorted assignee names, the notification addresses and an email index.
+ADMIN_FILTER = "PartitionKey eq 'admin'"
+ADMIN_CHANGES_FILTER = "PartitionKey eq 'admin' and Timestamp ge @since"
+DIRECTORY_TTL = float(os.getenv("ADMIN_DIRECTORY_TTL", "300"))
+FULL_REFRESH_INTERVAL = float(os.getenv("ADMIN_DIRECTORY_FULL_REFRESH", "3600"))
+REFRESH_OVERLAP = timedelta(seconds=2) # Same-instant writes are re-read, not missed
+
+
+def admin_email(admin: Dict[str, Any]) -> str:
+    """The admin's address: the 'email' column, falling back to the RowKey."""
+    return str(admin.get("email") or admin.get("RowKey") or "").strip()
+
+
+def admin_name(admin: Dict[str, Any]) -> str:
+    """The name shown in the "Assign to" list (the email when no name is set)."""
+    return str(admin.get("name") or admin.get("email") or "").strip()
+
+
+def _timestamp(entity: Any) -> Optional[datetime]:
+    metadata = getattr(entity, "metadata", None) or {}
+    return metadata.get("timestamp") or entity.get("Timestamp")
+
+
+def _plain(entity: Any) -> Dict[str, Any]:
+    out = dict(entity)
+    out.pop("Timestamp", None)
+    return out
+
+
+class AdminDirectory:
+    """Thread-safe, self-refreshing copy of the admin roster."""
+
+    def __init__(self, table_factory: Callable[[], TableClient], ttl: float = DIRECTORY_TTL,
+                 full_refresh_interval: float = FULL_REFRESH_INTERVAL, clock: Callable[[], float] = time.monotonic):
+        self.table_factory = table_factory
+        self.ttl = ttl
+        self.full_refresh_interval = full_refresh_interval
+        self.clock = clock
+        self.version = 0
+        self.watermark: Optional[datetime] = None
+        self._admins: Dict[str, Dict[str, Any]] = {}
+        self._names: List[str] = []
+        self._name_set: set = set()
+        self._emails: List[str] = []
+        self._by_email: Dict[str, Dict[str, Any]] = {}
+        self._loaded = False
+        self._fresh_until = 0.0
+        self._full_due = 0.0
+        self._lock = threading.Lock() # Guards the derived views
+        self._refresh_lock = threading.Lock() # One refresh at a time
+
+    # ---- loading ----
+    def seed(self, entities: List[Any]) -> bool:
+        """Loads a roster read elsewhere (e.g. concurrently at start-up) if nothing is loaded yet."""
+        with self._refresh_lock:
+            if self._loaded:
+                return False
+            self._replace(entities)
+            return True
+
+    def reload(self):
+        """Re-reads the whole roster (e.g. after an admin import)."""
+        with self._refresh_lock:
+            self._replace(list(self.table_factory().query_entities(ADMIN_FILTER)))
+
+    def _replace(self, entities: List[Any]):
+        now = self.clock()
+        self.watermark = max(filter(None, map(_timestamp, entities)), default=None)
+        self._full_due = now + self.full_refresh_interval
+        self._fresh_until = now + self.ttl
+        self._rebuild({e["RowKey"]: _plain(e) for e in entities})
+
+    def _refresh_changes(self):
+        if self.watermark is None:
+            self._replace(list(self.table_factory().query_entities(ADMIN_FILTER)))
+            return
+        entities = list(self.table_factory().query_entities(
+            ADMIN_CHANGES_FILTER, parameters={"since": self.watermark - REFRESH_OVERLAP}))
+        self._fresh_until = self.clock() + self.ttl
+        stamps = [ts for ts in map(_timestamp, entities) if ts is not None]
+        if stamps:
+            self.watermark = max(stamps + [self.watermark])
+        changed = {e["RowKey"]: _plain(e) for e in entities if self._admins.get(e["RowKey"]) != _plain(e)}
+        if changed:
+            self._rebuild({**self._admins, **changed})
+
+    def _rebuild(self, admins: Dict[str, Dict[str, Any]]):
+        names = sorted({admin_name(a) for a in admins.values()} - {""})
+        by_email = {admin_email(a).lower(): a for a in admins.values() if "@" in admin_email(a)}
+        emails = [admin_email(a) for a in admins.values() if "@" in admin_email(a)]
+        with self._lock:
+            self._admins, self._names, self._name_set = admins, names, set(names)
+            self._emails, self._by_email = emails, by_email
+            self._loaded = True
+            self.version += 1
+
+    def ensure_fresh(self):
+        """Loads the roster on first use and refreshes it once the TTL has passed.
+
+        Only the first load blocks; later refreshes are done by one caller while the
+        others keep reading the current copy. A failed refresh keeps the old roster.
+        """
+        if not self._loaded:
+            with self._refresh_lock:
+                if not self._loaded:
+                    self._replace(list(self.table_factory().query_entities(ADMIN_FILTER)))
+            return
+        now = self.clock()
+        if now < self._fresh_until or not self._refresh_lock.acquire(blocking=False):
+            return
+        try:
+            if now >= self._full_due:
+                self._replace(list(self.table_factory().query_entities(ADMIN_FILTER)))
+            else:
+                self._refresh_changes()
+        except Exception as e:
+            self._fresh_until = now + self.ttl # Don't retry on every read while the table is unreachable
+            print(f"⚠️ Admin directory refresh failed, keeping the cached roster: {e}")
+        finally:
+            self._refresh_lock.release()
+
+    # ---- views ----
+    def admins(self) -> List[Dict[str, Any]]:
+        self.ensure_fresh()
+        with self._lock:
+            return [dict(a) for a in self._admins.values()]
+
+    def assignee_names(self, include: Optional[str] = None) -> List[str]:
+        """Sorted admin names for the "Assign to" list, plus `include` (e.g. the current admin).
+
+        The list is shared by all callers: copy it before changing it.
+        """
+        self.ensure_fresh()
+        with self._lock:
+            names, known = self._names, include in self._name_set
+        if not include or known:
+            return names
+        names = list(names)
+        insort(names, include)
+        return names
+
+    def notification_emails(self) -> List[str]:
+        """Addresses of every admin to notify of a new grievance."""
+        self.ensure_fresh()
+        with self._lock:
+            return list(self._emails)
+
+    def by_email(self, email: str) -> Optional[Dict[str, Any]]:
+        self.ensure_fresh()
+        with self._lock:
+            admin = self._by_email.get((email or "").strip().lower())
+            return dict(admin) if admin is not None else None
@@ -0,0 +1,229 @@
+import argparse
+import itertools
+import re
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from azure.core import MatchConditions
+from azure.core.exceptions import ResourceExistsError, ResourceModifiedError, ResourceNotFoundError
+from azure.data.tables import TableClient, TableTransactionError, UpdateMode
+
+from grievance_schema import STATUSES, DATETIME_FORMAT
+
+# --------------------------------------------------------------------------------
+# MATERIALISED AGGREGATES (KPI counts by year, month, category, assignee, employee)
+# --------------------------------------------------------------------------------
+# One entity per bucket in the aggregates table, e.g. RowKey "year-2025" holds
+# Raised / Open / WIP / Closed counts for tickets created in 2025. Status counts are
+# columns of every bucket, so "counts by status" for any dimension is a single read.
+AGG_PARTITION = "AGG"
+COUNT_FIELDS = ["Raised"] + STATUSES
+DIMENSIONS = ["all", "year", "month", "category", "assignee", "employee"]
+MAX_RETRIES = 8
+BATCH_SIZE = 100 # Azure Tables transaction limit
+KEYS_PER_QUERY = 14 # Azure Tables allows 15 comparisons per filter (one is the PartitionKey)
+
+_INVALID_KEY_CHARS = re.compile(r"[/\\#?\x00-\x1f\x7f]")
+
+
+def bucket_row_key(dimension: str, value: str = "") -> str:
+    """Returns the RowKey of a bucket (characters Azure forbids in keys are replaced)."""
+    if dimension == "all":
+        return "all"
+    return _INVALID_KEY_CHARS.sub("_", f"{dimension}-{value}")
+
+
+def _parse_created(value: Any) -> Optional[datetime]:
+    if isinstance(value, datetime):
+        return value
+    text = str(value or "").strip()
+    try:
+        return datetime.strptime(text[:19], DATETIME_FORMAT)
+    except ValueError:
+        try:
+            return datetime.fromisoformat(text)
+        except ValueError:
+            return None
+
+
+def buckets_for(entity: Dict[str, Any]) -> List[Tuple[str, str]]:
+    """Lists the (dimension, value) buckets a grievance entity counts towards."""
+    buckets = [("all", "")]
+    created = _parse_created(entity.get("created_at"))
+    if created is not None:
+        buckets.append(("year", f"{created.year}"))
+        buckets.append(("month", f"{created.year}-{created.month:02d}"))
+    buckets.append(("category", str(entity.get("category") or "Other")))
+    buckets.append(("assignee", str(entity.get("assigned_to") or "Unassigned")))
+    buckets.append(("employee", str(entity.get("employee_email") or "").lower()))
+    return buckets
+
+
+def _add(deltas: Dict[str, Dict[str, Any]], entity: Dict[str, Any], sign: int):
+    status = entity.get("status") or "Open"
+    for dimension, value in buckets_for(entity):
+        row_key = bucket_row_key(dimension, value)
+        slot = deltas.setdefault(row_key, {"dimension": dimension, "key": value, "counts": Counter()})
+        slot["counts"]["Raised"] += sign
+        slot["counts"][status] += sign
+
+
+def compute_deltas(before: Optional[Dict[str, Any]], after: Optional[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Returns per-bucket count changes for a create (before=None) or an update."""
+    deltas: Dict[str, Dict[str, Any]] = {}
+    if before:
+        _add(deltas, before, -1)
+    if after:
+        _add(deltas, after, +1)
+    # Drop buckets whose changes cancel out (e.g. the "all" Raised count on an update)
+    for row_key in list(deltas):
+        counts = deltas[row_key]["counts"]
+        for field in [f for f, n in counts.items() if n == 0]:
+            del counts[field]
+        if not counts:
+            del deltas[row_key]
+    return deltas
+
+
+def _read_buckets(table: TableClient, row_keys: List[str]) -> Dict[str, Any]:
+    """Reads the existing buckets among `row_keys` by RowKey, in as few queries as the filter limit allows."""
+    found = {}
+    for i in range(0, len(row_keys), KEYS_PER_QUERY):
+        chunk = row_keys[i:i + KEYS_PER_QUERY]
+        parameters = {"pk": AGG_PARTITION, **{f"k{n}": key for n, key in enumerate(chunk)}}
+        keys = " or ".join(f"RowKey eq @k{n}" for n in range(len(chunk)))
+        for entity in table.query_entities(f"PartitionKey eq @pk and ({keys})", parameters=parameters):
+            found[entity["RowKey"]] = entity
+    return found
+
+
+def record_change(table: TableClient, before: Optional[Dict[str, Any]], after: Optional[Dict[str, Any]]) -> bool:
+    """Applies the aggregate side effects of creating (before=None) or updating a grievance.
+
+    The touched buckets are read in one query and written in one transaction, each
+    update guarded by its ETag, so the counts move together or not at all; on a
+    conflict the whole read-modify-write is retried. Does nothing (returns False)
+    until the table has been built with `rebuild`, so a fresh deployment never
+    accumulates partial counts.
+    """
+    deltas = compute_deltas(before, after)
+    all_key = bucket_row_key("all")
+    for _ in range(MAX_RETRIES):
+        current = _read_buckets(table, sorted(set(deltas) | {all_key}))
+        if all_key not in current:
+            return False
+        if not deltas:
+            return True
+        operations = []
+        for row_key, slot in deltas.items():
+            entity = current.get(row_key)
+            if entity is None:
+                entity = {"PartitionKey": AGG_PARTITION, "RowKey": row_key, "dimension": slot["dimension"], "key": slot["key"]}
+                entity.update({f: max(0, slot["counts"].get(f, 0)) for f in COUNT_FIELDS})
+                operations.append(("create", entity))
+                continue
+            for field, delta in slot["counts"].items():
+                entity[field] = int(entity.get(field, 0) or 0) + delta
+            operations.append(("update", entity, {"mode": UpdateMode.REPLACE, "etag": entity.metadata["etag"],
+                                                  "match_condition": MatchConditions.IfNotModified}))
+        try:
+            table.submit_transaction(operations)
+            return True
+        except TableTransactionError as e:
+            if e.status_code not in (409, 412):
+                raise
+            # 409/412: a concurrent writer created or changed one of the buckets; re-read and re-apply all
+        except (ResourceExistsError, ResourceModifiedError):
+            pass # Same conflicts, as raised by single-entity stand-ins (loadtest.py)
+    raise RuntimeError(f"Could not update aggregate buckets {sorted(deltas)} after {MAX_RETRIES} attempts")
+
+
+def entity_counts(entity: Dict[str, Any]) -> Dict[str, int]:
+    """Reads the COUNT_FIELDS of a bucket entity as non-negative ints."""
+    return {f: max(0, int(entity.get(f, 0) or 0)) for f in COUNT_FIELDS}
+
+
+def read_counts(table: TableClient, row_key: str) -> Optional[Dict[str, int]]:
+    """Reads one bucket's counts, or None if the bucket (or the table) doesn't exist."""
+    try:
+        return entity_counts(table.get_entity(partition_key=AGG_PARTITION, row_key=row_key))
+    except ResourceNotFoundError:
+        return None
+
+
+def read_dimension(table: TableClient, dimension: str) -> Dict[str, Dict[str, int]]:
+    """Reads every bucket of a dimension, e.g. {"2025": {...}, "2024": {...}} for "year"."""
+    entities = table.query_entities(
+        "PartitionKey eq @pk and dimension eq @dim",
+        parameters={"pk": AGG_PARTITION, "dim": dimension},
+    )
+    return {e.get("key", ""): entity_counts(e) for e in entities}
+
+
+def compute_all(grievances: Iterable[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Computes every bucket from scratch."""
+    totals: Dict[str, Dict[str, Any]] = {}
+    for entity in grievances:
+        _add(totals, entity, +1)
+    return totals
+
+
+def _submit_batches(table: TableClient, operations: List[Tuple]):
+    for i in range(0, len(operations), BATCH_SIZE):
+        table.submit_transaction(operations[i:i + BATCH_SIZE])
+
+
+def rebuild(grievance_table: TableClient, aggregates_table: TableClient,
+            archived: Iterable[Dict[str, Any]] = ()) -> int:
+    """Recomputes the aggregates table from the grievance table, repairing any drift.
+
+    `archived` supplies grievances moved to the cold archive (see archive.py) so the
+    counts keep covering the full history. Run it while writes are quiet: changes
+    made during the scan may be counted twice or missed until the next rebuild.
+    """
+    try:
+        aggregates_table.create_table()
+    except ResourceExistsError:
+        pass
+
+    grievances = grievance_table.query_entities(
+        "PartitionKey eq 'GRIEVANCE'",
+        select=["RowKey", "status", "category", "assigned_to", "employee_email", "created_at"],
+    )
+    totals = compute_all(itertools.chain(grievances, archived))
+    # The "all" bucket marks the table as initialised, even with no grievances yet
+    totals.setdefault(bucket_row_key("all"), {"dimension": "all", "key": "", "counts": Counter()})
+
+    upserts = []
+    for row_key, slot in totals.items():
+        entity = {"PartitionKey": AGG_PARTITION, "RowKey": row_key,
+                  "dimension": slot["dimension"], "key": slot["key"]}
+        entity.update({f: slot["counts"].get(f, 0) for f in COUNT_FIELDS})
+        upserts.append(("upsert", entity, {"mode": UpdateMode.REPLACE}))
+    _submit_batches(aggregates_table, upserts)
+
+    existing = aggregates_table.query_entities(f"PartitionKey eq '{AGG_PARTITION}'", select=["RowKey"])
+    stale = [("delete", {"PartitionKey": AGG_PARTITION, "RowKey": e["RowKey"]})
+             for e in existing if e["RowKey"] not in totals]
+    _submit_batches(aggregates_table, stale)
+    return len(totals)
+
+
+def main(argv: Optional[List[str]] = None):
+    from azure_clients import get_table_client, get_blob_client, GRIEVANCE_TABLE_NAME, AGGREGATES_TABLE_NAME
+    from archive import get_archive_container, iter_archived_entities
+
+    parser = argparse.ArgumentParser(description="Maintain the grievance aggregates table.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("rebuild", help="Recompute all aggregates from the grievance table (repairs drift).")
+    args = parser.parse_args(argv)
+
+    if args.command == "rebuild":
+        n = rebuild(get_table_client(GRIEVANCE_TABLE_NAME), get_table_client(AGGREGATES_TABLE_NAME),
+                    archived=iter_archived_entities(get_archive_container(get_blob_client())))
+        print(f"✅ Rebuilt {n} aggregate buckets.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+from datetime import datetime
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# --------------------------------------------------------------------------------
+# SLA / RESOLUTION ANALYTICS (vectorised over the typed grievance DataFrame)
+# --------------------------------------------------------------------------------
+# Comment lines are written by the dialog as "[YYYY-mm-dd HH:MM] Author: text".
+COMMENT_PATTERN = r"^\[(?P<ts>\d{4}-\d{2}-\d{2} \d{2}:\d{2})\]\s*(?P<author>[^:]+?):"
+PERCENTILES = [50, 90, 99]
+HOUR = pd.Timedelta(hours=1)
+
+
+def parse_comments(df: pd.DataFrame) -> pd.DataFrame:
+    """Explodes the comments column into one row per timestamped comment.
+
+    Returns columns: row (position in df), ts (datetime64), author. Legacy lines
+    without a "[timestamp] author:" prefix are dropped. Splitting and matching run
+    in pyarrow compute kernels rather than per-row Python.
+    """
+    lists = pc.split_pattern(pa.array(df["comments"].to_numpy(dtype=object), type=pa.string()), "\n")
+    lines = pc.utf8_trim_whitespace(pc.list_flatten(lists))
+    parts = pc.extract_regex(lines, COMMENT_PATTERN)
+    ts = pc.strptime(pc.struct_field(parts, "ts"), format="%Y-%m-%d %H:%M", unit="s", error_is_null=True)
+    out = pd.DataFrame({
+        "row": pc.list_parent_indices(lists).to_numpy(),
+        "ts": ts.to_pandas(),
+        "author": pc.utf8_trim_whitespace(pc.struct_field(parts, "author")).to_pandas(),
+    })
+    return out.dropna(subset=["ts"]).reset_index(drop=True)
+
+
+def _summary(hours: pd.Series) -> Dict[str, float]:
+    """Count, mean and percentiles of a duration series expressed in hours."""
+    values = hours.dropna().to_numpy(dtype=float)
+    out = {"count": int(values.size), "mean_h": float(values.mean()) if values.size else np.nan}
+    pcts = np.percentile(values, PERCENTILES) if values.size else [np.nan] * len(PERCENTILES)
+    out.update({f"p{p}_h": float(v) for p, v in zip(PERCENTILES, pcts)})
+    return out
+
+
+def first_response_hours(df: pd.DataFrame, comments: pd.DataFrame) -> pd.Series:
+    """Hours from creation to the first comment by someone other than the reporter."""
+    reporter = df["employee_name"].astype(str).str.strip().to_numpy()
+    rows = comments["row"].to_numpy()
+    responders = comments[comments["author"].to_numpy() != reporter[rows]]
+    first = responders.groupby("row")["ts"].min()
+    hours = np.full(len(df), np.nan)
+    created = df["created_at"].to_numpy()
+    hours[first.index.to_numpy()] = (first.to_numpy() - created[first.index.to_numpy()]) / np.timedelta64(1, "h")
+    return pd.Series(hours, index=df.index).clip(lower=0)
+
+
+def close_hours(df: pd.DataFrame) -> pd.Series:
+    """Hours from creation to closure for closed tickets (closure = last update)."""
+    closed = df[df["status"] == "Closed"]
+    return ((closed["updated_at"] - closed["created_at"]) / HOUR).clip(lower=0)
+
+
+def backlog_age_days(df: pd.DataFrame, now: Optional[datetime] = None) -> pd.Series:
+    """Age in days of every ticket that is not closed."""
+    now = pd.Timestamp(now or datetime.now())
+    backlog = df[df["status"] != "Closed"]
+    return (now - backlog["created_at"]) / pd.Timedelta(days=1)
+
+
+def assignee_throughput(df: pd.DataFrame, ttc_hours: pd.Series, now: Optional[datetime] = None) -> pd.DataFrame:
+    """Per-assignee closed totals, closures in the last 30 days, open load and median time-to-close."""
+    now = pd.Timestamp(now or datetime.now())
+    assignee = df["assigned_to"].astype(str).replace("", "Unassigned")
+    is_closed = df["status"] == "Closed"
+    frame = pd.DataFrame({
+        "assignee": assignee,
+        "closed": is_closed,
+        "closed_30d": is_closed & (df["updated_at"] >= now - pd.Timedelta(days=30)),
+        "open": ~is_closed,
+        "ttc_h": ttc_hours.reindex(df.index),
+    })
+    out = frame.groupby("assignee", observed=True).agg(
+        closed=("closed", "sum"),
+        closed_30d=("closed_30d", "sum"),
+        open=("open", "sum"),
+        median_close_h=("ttc_h", "median"),
+    )
+    return out.sort_values(["closed", "open"], ascending=False)
+
+
+def monthly_flow(df: pd.DataFrame) -> pd.DataFrame:
+    """Tickets raised and closed per calendar month."""
+    raised = df["created_at"].dt.to_period("M").value_counts()
+    closed = df.loc[df["status"] == "Closed", "updated_at"].dt.to_period("M").value_counts()
+    out = pd.DataFrame({"raised": raised, "closed": closed}).fillna(0).astype(int).sort_index()
+    out.index = out.index.astype(str)
+    return out
+
+
+def build_report(df: pd.DataFrame, now: Optional[datetime] = None) -> Dict[str, object]:
+    """Computes the admin analytics report over the full grievance history."""
+    df = df.dropna(subset=["created_at"])
+    comments = parse_comments(df)
+    frt = first_response_hours(df, comments)
+    ttc = close_hours(df)
+    age = backlog_age_days(df, now)
+
+    age_pcts = np.percentile(age.dropna(), PERCENTILES) if age.notna().any() else [np.nan] * len(PERCENTILES)
+    summary = pd.DataFrame(
+        [_summary(frt), _summary(ttc)],
+        index=["Time to first response", "Time to close"],
+    )
+    return {
+        "summary": summary,
+        "responded_pct": float(frt.notna().mean() * 100) if len(frt) else np.nan,
+        "backlog": {
+            "count": int(age.size),
+            **{f"p{p}_days": float(v) for p, v in zip(PERCENTILES, age_pcts)},
+            "max_days": float(age.max()) if age.size else np.nan,
+        },
+        "assignees": assignee_throughput(df, ttc, now),
+        "monthly": monthly_flow(df),
+    }
@@ -0,0 +1,261 @@
+import argparse
+import io
+import os
+import re
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import pandas as pd
+from azure.core import MatchConditions
+from azure.core.exceptions import ResourceExistsError, ResourceModifiedError, ResourceNotFoundError
+from azure.data.tables import TableClient, TableTransactionError, UpdateMode
+from azure.storage.blob import BlobServiceClient, ContainerClient
+
+from grievance_schema import GRIEVANCE_SCHEMA, DATETIME_FORMAT
+import text_codec
+
+# --------------------------------------------------------------------------------
+# HOT/COLD ARCHIVE (closed grievances moved to one Parquet file per year in Blob)
+# --------------------------------------------------------------------------------
+ARCHIVE_CONTAINER_NAME = os.getenv("ARCHIVE_CONTAINER_NAME", "grievancearchive")
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "365"))
+ARCHIVE_PREFIX = "grievances_"
+BATCH_SIZE = 100 # Azure Tables transaction limit
+
+# Archived files keep the raw table fields (RowKey included) as strings, so they load
+# through grievance_schema.to_typed_frame exactly like live entities. Long text that
+# the table stores compressed (text_codec.py) is archived in plain text: Parquet
+# compresses the whole file anyway.
+ARCHIVE_COLUMNS = ["RowKey"] + [c for c in GRIEVANCE_SCHEMA if c != "id"]
+_YEAR_RE = re.compile(rf"^{ARCHIVE_PREFIX}(\d{{4}})\.parquet$")
+
+# Archived tickets leave the live table, but their ids must never be issued again
+# (the next archive run would merge the new ticket over the old one). The highest
+# archived id number is kept in the grievance table under its own partition, which
+# every grievance query already filters out.
+ID_MARK_PARTITION = "IDMARK"
+ID_MARK_ROW = "archived"
+_GRV_ID_RE = re.compile(r"^GRV_(\d+)$")
+
+
+def archive_blob_name(year: int) -> str:
+    return f"{ARCHIVE_PREFIX}{year}.parquet"
+
+
+def get_archive_container(blob_service: BlobServiceClient) -> ContainerClient:
+    return blob_service.get_container_client(ARCHIVE_CONTAINER_NAME)
+
+
+def years_from_names(names: Iterable[str]) -> List[int]:
+    """Returns the years of the archive files among blob names, newest first."""
+    years = [int(m.group(1)) for m in map(_YEAR_RE.match, names) if m]
+    return sorted(years, reverse=True)
+
+
+def list_archived_years(container: ContainerClient) -> List[int]:
+    """Returns the years that have an archive file, newest first."""
+    try:
+        names = [b.name for b in container.list_blobs(name_starts_with=ARCHIVE_PREFIX)]
+    except ResourceNotFoundError:
+        return [] # Container not created yet: nothing archived
+    return years_from_names(names)
+
+
+def read_archive(container: ContainerClient, year: int) -> pd.DataFrame:
+    """Downloads one year's archive as a raw (string) DataFrame; empty if missing."""
+    try:
+        data = container.get_blob_client(archive_blob_name(year)).download_blob().readall()
+    except ResourceNotFoundError:
+        return pd.DataFrame(columns=ARCHIVE_COLUMNS)
+    return pd.read_parquet(io.BytesIO(data))
+
+
+def iter_archived_entities(container: ContainerClient) -> Iterator[Dict[str, Any]]:
+    """Yields every archived grievance as a raw entity dict, one year file at a time."""
+    for year in list_archived_years(container):
+        yield from read_archive(container, year).to_dict("records")
+
+
+def _to_frame(entities: List[Dict[str, Any]]) -> pd.DataFrame:
+    df = pd.DataFrame(entities)
+    for col in ARCHIVE_COLUMNS:
+        if col not in df.columns:
+            df[col] = ""
+    return df[ARCHIVE_COLUMNS].fillna("").astype(str)
+
+
+def _write_year(container: ContainerClient, year: int, entities: List[Dict[str, Any]],
+                drop: Iterable[str] = ()) -> int:
+    """Merges entities into the year's archive file, less the `drop` RowKeys (ETag-guarded); returns its row count."""
+    blob = container.get_blob_client(archive_blob_name(year))
+    try:
+        downloader = blob.download_blob()
+        etag = downloader.properties.etag
+        existing = pd.read_parquet(io.BytesIO(downloader.readall()))
+    except ResourceNotFoundError:
+        etag, existing = None, None
+
+    merged = _to_frame(entities)
+    if existing is not None:
+        merged = pd.concat([existing[ARCHIVE_COLUMNS], merged], ignore_index=True)
+        merged = merged.drop_duplicates(subset="RowKey", keep="last")
+    drop = set(drop)
+    if drop:
+        merged = merged[~merged["RowKey"].isin(drop)]
+    merged = merged.sort_values("created_at").reset_index(drop=True)
+
+    buf = io.BytesIO()
+    merged.to_parquet(buf, index=False, compression="zstd")
+    buf.seek(0)
+    if etag is None:
+        blob.upload_blob(buf, overwrite=False) # Fails if another job created it meanwhile
+    else:
+        blob.upload_blob(buf, overwrite=True, etag=etag, match_condition=MatchConditions.IfNotModified)
+    return len(merged)
+
+
+def grievance_id_number(row_key: Any) -> int:
+    """The number in a GRV_xxx id (0 for anything else)."""
+    match = _GRV_ID_RE.match(str(row_key or ""))
+    return int(match.group(1)) if match else 0
+
+
+def read_id_high_water(grievance_table: TableClient) -> Optional[int]:
+    """Highest grievance id number ever archived, or None if no archive run has recorded one."""
+    try:
+        return int(grievance_table.get_entity(partition_key=ID_MARK_PARTITION, row_key=ID_MARK_ROW).get("max_id", 0))
+    except ResourceNotFoundError:
+        return None
+
+
+def raise_id_high_water(grievance_table: TableClient, number: int) -> int:
+    """Raises the archived-id mark to at least `number` (ETag-guarded) and returns the mark."""
+    while True:
+        try:
+            mark = grievance_table.get_entity(partition_key=ID_MARK_PARTITION, row_key=ID_MARK_ROW)
+        except ResourceNotFoundError:
+            try:
+                grievance_table.create_entity(entity={"PartitionKey": ID_MARK_PARTITION, "RowKey": ID_MARK_ROW, "max_id": number})
+                return number
+            except ResourceExistsError:
+                continue # Another job created it: re-read and compare
+        if int(mark.get("max_id", 0)) >= number:
+            return int(mark["max_id"])
+        mark["max_id"] = number
+        try:
+            grievance_table.update_entity(entity=mark, mode=UpdateMode.REPLACE, etag=mark.metadata["etag"],
+                                          match_condition=MatchConditions.IfNotModified)
+            return number
+        except ResourceModifiedError:
+            continue # Another job raised it meanwhile: re-read and compare
+
+
+def _delete_unchanged(grievance_table: TableClient, row_keys: List[str], etags: Dict[str, Optional[str]]) -> List[str]:
+    """Deletes rows still at the version that was archived; returns the ones that changed since.
+
+    The batch is one ETag-guarded transaction; if any row fails its check, the rows
+    are deleted one by one so the unchanged ones still go.
+    """
+    def guard(row_key: str) -> Dict[str, Any]:
+        return {"etag": etags[row_key], "match_condition": MatchConditions.IfNotModified} if etags.get(row_key) else {}
+    try:
+        grievance_table.submit_transaction(
+            [("delete", {"PartitionKey": "GRIEVANCE", "RowKey": k}, guard(k)) for k in row_keys])
+        return []
+    except (TableTransactionError, ResourceModifiedError):
+        pass
+    changed = []
+    for row_key in row_keys:
+        try:
+            grievance_table.delete_entity(partition_key="GRIEVANCE", row_key=row_key, **guard(row_key))
+        except ResourceModifiedError:
+            changed.append(row_key)
+        except ResourceNotFoundError:
+            pass # Already gone (e.g. an earlier interrupted run)
+    return changed
+
+
+def _archive_year(entity: Dict[str, Any]) -> int:
+    for field in ["created_at", "updated_at"]:
+        try:
+            return datetime.strptime(str(entity.get(field, ""))[:19], DATETIME_FORMAT).year
+        except ValueError:
+            continue
+    return datetime.now().year
+
+
+def archive_closed(grievance_table: TableClient, blob_service: BlobServiceClient,
+                   older_than_days: int = ARCHIVE_AFTER_DAYS, dry_run: bool = False) -> Dict[int, int]:
+    """Moves closed grievances last updated more than `older_than_days` ago to the archive.
+
+    Each year's Parquet file is written before its entities are deleted from the live
+    table, so an interrupted run only leaves rows in both places; re-running is safe
+    because archive rows are de-duplicated by RowKey. Returns {year: archived count}.
+    """
+    cutoff = (datetime.now() - timedelta(days=older_than_days)).strftime(DATETIME_FORMAT)
+    candidates = grievance_table.query_entities(
+        "PartitionKey eq 'GRIEVANCE' and status eq 'Closed' and updated_at lt @cutoff",
+        parameters={"cutoff": cutoff},
+    )
+    by_year: Dict[int, List[Dict[str, Any]]] = {}
+    etags: Dict[str, str] = {} # The version each row was archived at (the decoded copies drop metadata)
+    for entity in candidates:
+        etags[entity["RowKey"]] = (getattr(entity, "metadata", None) or {}).get("etag")
+        entity = text_codec.decode_entity(entity)
+        by_year.setdefault(_archive_year(entity), []).append(dict(entity))
+
+    if dry_run or not by_year:
+        return {year: len(rows) for year, rows in by_year.items()}
+
+    container = get_archive_container(blob_service)
+    try:
+        container.create_container()
+    except ResourceExistsError:
+        pass
+
+    # Recorded before anything leaves the table, so the ids can't be issued again meanwhile
+    raise_id_high_water(grievance_table, max(grievance_id_number(e["RowKey"]) for rows in by_year.values() for e in rows))
+    archived: Dict[int, int] = {}
+    for year, rows in sorted(by_year.items()):
+        _write_year(container, year, rows)
+        changed = []
+        for i in range(0, len(rows), BATCH_SIZE):
+            changed += _delete_unchanged(grievance_table, [e["RowKey"] for e in rows[i:i + BATCH_SIZE]], etags)
+        if changed:
+            # Reopened or edited since the query: the live row wins and the stale copy leaves the archive
+            print(f"⚠️ {len(changed)} grievances changed while archiving {year} and were kept live: {', '.join(changed)}")
+            _write_year(container, year, [], drop=changed)
+        archived[year] = len(rows) - len(changed)
+    return archived
+
+
+def main(argv: Optional[List[str]] = None):
+    from azure_clients import get_table_client, get_blob_client, GRIEVANCE_TABLE_NAME
+
+    parser = argparse.ArgumentParser(description="Archive closed grievances to Parquet in Blob storage.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    run = sub.add_parser("run", help="Move old closed grievances from the live table to the archive.")
+    run.add_argument("--older-than-days", type=int, default=ARCHIVE_AFTER_DAYS)
+    run.add_argument("--dry-run", action="store_true", help="Only report what would be archived.")
+    sub.add_parser("list", help="List archived years.")
+    args = parser.parse_args(argv)
+
+    if args.command == "list":
+        years = list_archived_years(get_archive_container(get_blob_client()))
+        print(", ".join(str(y) for y in years) or "No archived years.")
+        return
+
+    result = archive_closed(get_table_client(GRIEVANCE_TABLE_NAME), get_blob_client(),
+                            older_than_days=args.older_than_days, dry_run=args.dry_run)
+    if result and not args.dry_run:
+        from cache_coherence import publish_change
+        publish_change() # Running app instances drop their caches
+    verb = "Would archive" if args.dry_run else "✅ Archived"
+    for year, count in sorted(result.items()):
+        print(f"{verb} {count} grievances from {year}")
+    if not result:
+        print("Nothing to archive.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+import heapq
+import os
+import re
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from admin_directory import admin_name
+
+# --------------------------------------------------------------------------------
+# AUTO-ASSIGNMENT (workload-aware routing of new grievances to admins)
+# --------------------------------------------------------------------------------
+# Each admin is keyed by (open tickets, last-assigned sequence, name), so the best
+# owner is the least-loaded admin, with ties going to whoever got a ticket longest
+# ago. Admins sit in one min-heap per category they handle (the optional "categories"
+# column of the admin roster, e.g. "IT;Facilities"); admins without one handle every
+# category and share a general heap. A pick compares two heap tops and a load change
+# pushes a fresh key: both O(log n). Outdated keys are skipped when they surface.
+#
+# Rules (environment):
+#   AUTO_ASSIGN            "0" turns auto-assignment off (tickets start unassigned)
+#   AUTO_ASSIGN_MAX_OPEN   admins with this many open tickets get no more (0 = no cap)
+#   AUTO_ASSIGN_FALLBACK   "0" leaves a ticket unassigned when nobody handles its
+#                          category, instead of giving it to the least-loaded admin
+AUTO_ASSIGN = os.getenv("AUTO_ASSIGN", "1") != "0"
+MAX_OPEN = int(os.getenv("AUTO_ASSIGN_MAX_OPEN", "0"))
+FALLBACK_TO_ANY = os.getenv("AUTO_ASSIGN_FALLBACK", "1") != "0"
+_SKILL_SPLIT_RE = re.compile(r"[;,]")
+
+Key = Tuple[int, int, str] # (open tickets, last-assigned sequence, name)
+
+
+def admin_skills(admin: Dict[str, Any]) -> Set[str]:
+    """Lower-cased categories an admin handles; empty means every category."""
+    return {s.strip().lower() for s in _SKILL_SPLIT_RE.split(str(admin.get("categories") or "")) if s.strip()}
+
+
+def _counts_open(entity: Optional[Dict[str, Any]]) -> bool:
+    """True for a ticket that adds to its assignee's open-ticket count."""
+    return entity is not None and entity.get("status") != "Closed" and bool(str(entity.get("assigned_to") or "").strip())
+
+
+class WorkloadBalancer:
+    """Per-admin open-ticket counts and category heaps, updated incrementally as tickets change."""
+
+    def __init__(self, max_open: int = MAX_OPEN, fallback_to_any: bool = FALLBACK_TO_ANY):
+        self.max_open = max_open
+        self.fallback_to_any = fallback_to_any
+        self.roster_version: Optional[int] = None
+        self._open: Dict[str, Set[str]] = {} # Assignee (on the roster or not) -> open ticket ids
+        self._owner: Dict[str, str] = {} # Open ticket id -> assignee
+        self._pending: Set[str] = set() # Tickets picked for but not yet seen in the snapshot
+        self._last: Dict[str, int] = {}
+        self._sequence = 0
+        self._skills: Dict[str, Set[str]] = {} # Roster admins only
+        self._heaps: Dict[str, List[Key]] = {}
+        self._general: List[Key] = []
+        self._all: List[Key] = []
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict[str, Any]], **rules) -> "WorkloadBalancer":
+        balancer = cls(**rules)
+        for record in records:
+            if _counts_open(record):
+                balancer._set_owner(str(record["RowKey"]), str(record["assigned_to"]).strip())
+        return balancer
+
+    def _key(self, name: str) -> Key:
+        return (len(self._open.get(name, ())), self._last.get(name, 0), name)
+
+    def _heaps_of(self, name: str) -> List[List[Key]]:
+        skills = self._skills[name]
+        return [self._heaps[s] for s in skills] + [self._all] if skills else [self._general, self._all]
+
+    def _push(self, name: str):
+        if name not in self._skills:
+            return
+        key = self._key(name)
+        for heap in self._heaps_of(name):
+            heapq.heappush(heap, key)
+            if len(heap) > 4 * len(self._skills) + 16:
+                self._compact(heap)
+
+    def _compact(self, heap: List[Key]):
+        heap[:] = [key for key in heap if key == self._key(key[2]) and key[2] in self._skills]
+        heapq.heapify(heap)
+
+    def _top(self, heap: List[Key]) -> Optional[Key]:
+        while heap and (heap[0][2] not in self._skills or heap[0] != self._key(heap[0][2])):
+            heapq.heappop(heap) # Outdated key: the admin's load changed or they left the roster
+        return heap[0] if heap else None
+
+    def _set_owner(self, ticket_id: str, name: Optional[str]):
+        # Counts are sets of ticket ids, so seeing the same change twice is harmless
+        previous = self._owner.pop(ticket_id, None)
+        if previous == name:
+            if name is not None:
+                self._owner[ticket_id] = name
+            return
+        if previous is not None:
+            self._open[previous].discard(ticket_id)
+            if not self._open[previous]:
+                del self._open[previous]
+            self._push(previous)
+        if name is not None:
+            self._owner[ticket_id] = name
+            self._open.setdefault(name, set()).add(ticket_id)
+            self._push(name)
+
+    # ---- inputs ----
+    def set_roster(self, admins: Iterable[Dict[str, Any]], version: Optional[int] = None):
+        """Replaces the set of assignable admins and their category skills."""
+        with self._lock:
+            self._skills = {}
+            for admin in admins:
+                name = admin_name(admin)
+                if name:
+                    self._skills[name] = admin_skills(admin)
+            self._heaps, self._general, self._all = {}, [], []
+            for name, skills in self._skills.items():
+                for skill in skills:
+                    self._heaps.setdefault(skill, [])
+                key = self._key(name)
+                for heap in self._heaps_of(name):
+                    heap.append(key)
+            for heap in [self._general, self._all, *self._heaps.values()]:
+                heapq.heapify(heap)
+            self.roster_version = version
+
+    def apply(self, changes: Iterable[Tuple[Optional[Dict[str, Any]], Dict[str, Any]]]):
+        """Updates open-ticket counts from changed tickets ((before, after) pairs from the snapshot).
+
+        Only the new state of each ticket is used, so applying a change twice is a no-op.
+        """
+        with self._lock:
+            for _, after in changes:
+                ticket_id = str(after.get("RowKey", ""))
+                self._pending.discard(ticket_id) # The ticket itself now carries the count
+                self._set_owner(ticket_id, str(after["assigned_to"]).strip() if _counts_open(after) else None)
+
+    # ---- assignment ----
+    def pick(self, category: str) -> Optional[str]:
+        """The admin who should get a new ticket of this category, or None if nobody qualifies."""
+        with self._lock:
+            candidates = [self._top(self._heaps.get(str(category or "").lower(), [])), self._top(self._general)]
+            candidates = [key for key in candidates if key is not None]
+            if not candidates and self.fallback_to_any:
+                candidates = [key for key in [self._top(self._all)] if key is not None]
+            if not candidates:
+                return None
+            best = min(candidates)
+            if self.max_open and best[0] >= self.max_open:
+                return None # The least-loaded candidate is already at the cap
+            return best[2]
+
+    def assign(self, ticket_id: str, category: str) -> Optional[str]:
+        """Picks an owner and counts the ticket against them straight away.
+
+        The count is held as pending until the ticket shows up in the snapshot, so
+        tickets created in quick succession are spread out instead of stacking up
+        on the same admin. Call release() if the ticket is not created after all.
+        """
+        with self._lock:
+            self.release(ticket_id) # A retried create must not count twice
+            name = self.pick(category)
+            if name is None:
+                return None
+            self._sequence += 1
+            self._last[name] = self._sequence
+            self._pending.add(ticket_id)
+            self._set_owner(ticket_id, name)
+            return name
+
+    def release(self, ticket_id: str):
+        with self._lock:
+            if ticket_id in self._pending:
+                self._pending.discard(ticket_id)
+                self._set_owner(ticket_id, None)
+
+    def open_counts(self) -> Dict[str, int]:
+        """Open tickets per roster admin (pending picks included)."""
+        with self._lock:
+            return {name: len(self._open.get(name, ())) for name in sorted(self._skills)}
@@ -0,0 +1,77 @@
+import asyncio
+from typing import Any, Dict, List, Optional
+
+from azure.core.exceptions import ResourceNotFoundError
+from azure.data.tables.aio import TableServiceClient
+from azure.storage.blob.aio import BlobServiceClient
+
+import aggregates_store
+import archive
+from azure_clients import CONNECTION_STRING, GRIEVANCE_TABLE_NAME, ADMINS_TABLE_NAME, AGGREGATES_TABLE_NAME
+from snapshot_store import GRIEVANCE_FILTER
+
+# --------------------------------------------------------------------------------
+# ASYNC DASHBOARD LOADING (independent cold-start reads issued concurrently)
+# --------------------------------------------------------------------------------
+# A cold dashboard needs the admin list, every grievance, a KPI bucket, the year
+# buckets and the archived years. None depends on another, so they are awaited
+# together over the aio clients and the wait is roughly the slowest single read.
+
+
+async def _query(service: TableServiceClient, table_name: str, query_filter: str, **kw) -> List[Any]:
+    table = service.get_table_client(table_name)
+    return [e async for e in table.query_entities(query_filter, **kw)]
+
+
+async def _read_counts(service: TableServiceClient, row_key: str) -> Optional[Dict[str, int]]:
+    table = service.get_table_client(AGGREGATES_TABLE_NAME)
+    try:
+        entity = await table.get_entity(partition_key=aggregates_store.AGG_PARTITION, row_key=row_key)
+    except ResourceNotFoundError:
+        return None
+    return aggregates_store.entity_counts(entity)
+
+
+async def _read_dimension(service: TableServiceClient, dimension: str) -> Dict[str, Dict[str, int]]:
+    entities = await _query(service, AGGREGATES_TABLE_NAME, "PartitionKey eq @pk and dimension eq @dim",
+                            parameters={"pk": aggregates_store.AGG_PARTITION, "dim": dimension})
+    return {e.get("key", ""): aggregates_store.entity_counts(e) for e in entities}
+
+
+async def _archived_years(blobs: BlobServiceClient) -> List[int]:
+    container = blobs.get_container_client(archive.ARCHIVE_CONTAINER_NAME)
+    try:
+        names = [b.name async for b in container.list_blobs(name_starts_with=archive.ARCHIVE_PREFIX)]
+    except ResourceNotFoundError:
+        return []
+    return archive.years_from_names(names)
+
+
+async def load_dashboard(admins: bool = False, grievances: bool = False, count_keys: List[str] = (),
+                         year_buckets: bool = False, archived_years: bool = False) -> Dict[Any, Any]:
+    """Runs the requested reads concurrently.
+
+    Returns {"admins": [...], "grievances": [...], ("counts", row_key): {...} | None,
+    "year_buckets": {...}, "archived_years": [...]} for the requested items. A read
+    that failed maps to its exception, so callers can fall back to the sync path.
+    """
+    async with TableServiceClient.from_connection_string(CONNECTION_STRING) as service, \
+            BlobServiceClient.from_connection_string(CONNECTION_STRING) as blobs:
+        tasks = {}
+        if admins:
+            tasks["admins"] = _query(service, ADMINS_TABLE_NAME, "PartitionKey eq 'admin'")
+        if grievances:
+            tasks["grievances"] = _query(service, GRIEVANCE_TABLE_NAME, GRIEVANCE_FILTER)
+        for row_key in count_keys:
+            tasks[("counts", row_key)] = _read_counts(service, row_key)
+        if year_buckets:
+            tasks["year_buckets"] = _read_dimension(service, "year")
+        if archived_years:
+            tasks["archived_years"] = _archived_years(blobs)
+        results = await asyncio.gather(*tasks.values(), return_exceptions=True)
+    return dict(zip(tasks, results))
+
+
+def run_load_dashboard(**kw) -> Dict[Any, Any]:
+    """Synchronous entry point for the Streamlit script thread (which has no event loop)."""
+    return asyncio.run(load_dashboard(**kw))
@@ -0,0 +1,100 @@
+import os
+import threading
+from typing import Any, Callable, Dict
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+from azure.core.pipeline.transport import RequestsTransport
+from azure.data.tables import TableServiceClient, TableClient
+from azure.storage.blob import BlobServiceClient
+
+# --------------------------------------------------------------------------------
+# AZURE CONFIG / CLIENTS (shared by the Streamlit app and the command-line jobs)
+# --------------------------------------------------------------------------------
+load_dotenv()
+
+CONNECTION_STRING = os.getenv("CONNECTION_STRING", "")
+GRIEVANCE_TABLE_NAME = "Grievancesraised"
+ADMINS_TABLE_NAME = "adminsdetails"
+AGGREGATES_TABLE_NAME = "grievanceaggregates"
+CACHE_VERSION_TABLE_NAME = "grievancecacheversion" # Shared cache version (see cache_coherence.py)
+SUBMISSIONS_TABLE_NAME = "grievancesubmissions" # Submission outbox (see submissions.py)
+BLOB_CONTAINER_NAME = "grievanceattachements" # Your specified container name
+
+
+# Connection pooling: every client shares one requests Session, so TCP/TLS connections
+# are kept alive and reused across sessions, reads, writes and uploads.
+POOL_CONNECTIONS = int(os.getenv("AZURE_POOL_CONNECTIONS", "4"))  # Hosts kept pooled (table, blob, ...)
+POOL_MAXSIZE = int(os.getenv("AZURE_POOL_MAXSIZE", "32"))         # Kept-alive connections per host
+CONNECTION_TIMEOUT = int(os.getenv("AZURE_CONNECTION_TIMEOUT", "10"))
+READ_TIMEOUT = int(os.getenv("AZURE_READ_TIMEOUT", "60"))
+
+_registry_lock = threading.RLock() # Re-entrant: a client factory may build the service first
+_registry: Dict[str, Any] = {}
+
+
+def _get_or_create(key: str, create: Callable[[], Any]) -> Any:
+    client = _registry.get(key)
+    if client is None:
+        with _registry_lock:
+            client = _registry.get(key)
+            if client is None:
+                client = _registry[key] = create()
+    return client
+
+
+def _http_session() -> requests.Session:
+    def create():
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter) # Azurite / local emulator
+        return session
+    return _get_or_create("session", create)
+
+
+def _transport() -> RequestsTransport:
+    return _get_or_create("transport", lambda: RequestsTransport(
+        session=_http_session(), session_owner=False,
+        connection_timeout=CONNECTION_TIMEOUT, read_timeout=READ_TIMEOUT,
+    ))
+
+
+def get_table_service() -> TableServiceClient:
+    """Returns the process-wide Table service client (built once, pooled connections)."""
+    return _get_or_create("tables", lambda: TableServiceClient.from_connection_string(
+        conn_str=CONNECTION_STRING, transport=_transport()))
+
+
+def get_table_client(name: str) -> TableClient:
+    """Gets a client for a specific Azure Table (cached per table, sharing the service's pool)."""
+    return _get_or_create(f"table:{name}", lambda: get_table_service().get_table_client(name))
+
+
+def get_blob_client() -> BlobServiceClient:
+    """Gets the process-wide client for the Azure Blob Storage service."""
+    return _get_or_create("blobs", lambda: BlobServiceClient.from_connection_string(
+        conn_str=CONNECTION_STRING, transport=_transport()))
+
+
+def connection_stats() -> Dict[str, int]:
+    """Counts HTTP connections opened versus reused by the shared pool, per live host pool.
+
+    "requests" is the number of requests sent; every request that did not open a
+    connection reused a kept-alive one.
+    """
+    stats = {"hosts": 0, "opened": 0, "requests": 0, "reused": 0}
+    session = _registry.get("session")
+    if session is None:
+        return stats
+    for adapter in {id(a): a for a in session.adapters.values()}.values():
+        pools = adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            stats["hosts"] += 1
+            stats["opened"] += pool.num_connections
+            stats["requests"] += pool.num_requests
+    stats["reused"] = max(0, stats["requests"] - stats["opened"])
+    return stats
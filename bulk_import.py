@@ -0,0 +1,303 @@
+import argparse
+import csv
+import json
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from azure.core.exceptions import ResourceExistsError
+from azure.data.tables import TableClient, TableTransactionError, UpdateMode
+from openpyxl import load_workbook
+
+from grievance_schema import CATEGORIES, STATUSES, DATETIME_FORMAT
+from assignment import admin_skills
+import text_codec
+
+# --------------------------------------------------------------------------------
+# BULK IMPORT (stream legacy grievances / admin rosters from Excel into Azure Tables)
+# --------------------------------------------------------------------------------
+BATCH_SIZE = 100 # Azure Tables transaction limit
+DEFAULT_WORKERS = 8
+
+GRIEVANCE_FIELDS = ["title", "description", "category", "employee_name", "employee_email",
+                    "status", "assigned_to", "created_at", "updated_at", "comments", "attachments"]
+
+
+class RowError(ValueError):
+    """A workbook row that does not match the target schema."""
+
+
+def _text(value: Any) -> str:
+    return "" if value is None else str(value).strip()
+
+
+def _timestamp(value: Any, field: str) -> str:
+    if isinstance(value, datetime):
+        return value.strftime(DATETIME_FORMAT)
+    text = _text(value)
+    for fmt in (DATETIME_FORMAT, "%Y-%m-%d %H:%M", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(text, fmt).strftime(DATETIME_FORMAT)
+        except ValueError:
+            continue
+    raise RowError(f"{field} '{text}' is not a valid date/time")
+
+
+def _grievance_id(value: Any) -> str:
+    """Maps legacy numeric ids (1, 2, ...) to the app's GRV_001 format."""
+    text = _text(value)
+    if text.upper().startswith("GRV_"):
+        return text.upper()
+    try:
+        return f"GRV_{int(float(text)):03d}"
+    except ValueError:
+        raise RowError(f"id '{text}' is neither numeric nor GRV_xxx")
+
+
+def grievance_entity(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Validates one workbook row against the grievance schema and returns the entity."""
+    entity = {"PartitionKey": "GRIEVANCE", "RowKey": _grievance_id(row.get("id"))}
+    for field in GRIEVANCE_FIELDS:
+        entity[field] = _text(row.get(field))
+
+    if not entity["title"]:
+        raise RowError("title is empty")
+    if "@" not in entity["employee_email"]:
+        raise RowError(f"employee_email '{entity['employee_email']}' is not an email address")
+    entity["status"] = entity["status"] or "Open"
+    if entity["status"] not in STATUSES:
+        raise RowError(f"status '{entity['status']}' is not one of {STATUSES}")
+    if entity["category"] not in CATEGORIES:
+        raise RowError(f"category '{entity['category']}' is not one of {CATEGORIES}")
+    entity["created_at"] = _timestamp(row.get("created_at"), "created_at")
+    entity["updated_at"] = _timestamp(row.get("updated_at") or row.get("created_at"), "updated_at")
+    try:
+        return text_codec.encode_entity(entity) # Long legacy text is stored compressed
+    except text_codec.TextTooLargeError as e:
+        raise RowError(str(e))
+
+
+def admin_entity(row: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Validates one roster row; returns an admin entity, or None for non-admin users.
+
+    An optional "categories" column ("IT;HR") lists the categories the admin is
+    auto-assigned; blank means every category.
+    """
+    email = _text(row.get("email")).lower()
+    if "@" not in email:
+        raise RowError(f"email '{email}' is not an email address")
+    role = _text(row.get("role")).lower() or "admin"
+    if role not in ("admin", "employee"):
+        raise RowError(f"role '{role}' is not admin or employee")
+    if role != "admin":
+        return None
+    entity = {"PartitionKey": "admin", "RowKey": email, "email": email, "name": _text(row.get("name")) or email}
+    skills = admin_skills({"categories": _text(row.get("categories"))})
+    known = {c.lower(): c for c in CATEGORIES}
+    unknown = sorted(skills - set(known))
+    if unknown:
+        raise RowError(f"categories {unknown} are not among {CATEGORIES}")
+    if skills:
+        entity["categories"] = ";".join(known[s] for s in sorted(skills)) # Auto-assignment skills (assignment.py)
+    return entity
+
+
+def iter_rows(path: str, sheet: Optional[str] = None) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """Streams (row number, {header: value}) pairs using openpyxl's read-only mode."""
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        ws = wb[sheet] if sheet else wb.active
+        rows = ws.iter_rows(values_only=True)
+        header = [_text(h).lower() for h in next(rows, [])]
+        for number, values in enumerate(rows, start=2):
+            if values is None or all(v is None for v in values):
+                continue
+            yield number, dict(zip(header, values))
+    finally:
+        wb.close()
+
+
+class Checkpoint:
+    """Remembers the last workbook row below which every batch has been committed.
+
+    Batches finish out of order, so the mark only advances over a contiguous prefix;
+    after a crash at most the in-flight batches are re-sent, which is harmless:
+    roster rows are upserted, and a re-sent grievance that is already stored
+    unchanged counts as imported.
+    """
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self.done_through = 0
+        self._pending: Dict[int, int] = {} # first row -> last row of in-flight batches
+        self._finished: Set[int] = set()
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.done_through = json.load(f).get("done_through", 0)
+
+    def started(self, first: int, last: int):
+        with self._lock:
+            self._pending[first] = last
+
+    def finished(self, first: int):
+        with self._lock:
+            self._finished.add(first)
+            while self._pending:
+                lowest = min(self._pending)
+                if lowest not in self._finished:
+                    break
+                self.done_through = max(self.done_through, self._pending.pop(lowest))
+                self._finished.discard(lowest)
+            self._save()
+
+    def _save(self):
+        if self.path:
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"done_through": self.done_through}, f)
+            os.replace(tmp, self.path)
+
+    def clear(self):
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def _create_rows(table: TableClient, batch: List[Tuple[int, Dict[str, Any]]]) -> List[Tuple[int, str]]:
+    """Creates a batch's entities, never overwriting; returns (row, error) for ids that are taken.
+
+    The whole batch is tried as one transaction first; if any id exists the rows are
+    created one by one. A stored entity identical to the row (a re-sent batch after
+    a resume) is not a conflict.
+    """
+    try:
+        table.submit_transaction([("create", e) for _, e in batch])
+        return []
+    except (TableTransactionError, ResourceExistsError):
+        pass
+    conflicts = []
+    for number, entity in batch:
+        try:
+            table.create_entity(entity=entity)
+        except ResourceExistsError:
+            existing = table.get_entity(partition_key=entity["PartitionKey"], row_key=entity["RowKey"])
+            if {k: v for k, v in existing.items() if k != "Timestamp"} != entity:
+                conflicts.append((number, f"id {entity['RowKey']} already exists; the stored ticket was not overwritten"))
+    return conflicts
+
+
+def import_rows(rows: Iterator[Tuple[int, Dict[str, Any]]], to_entity: Callable[[Dict[str, Any]], Optional[Dict[str, Any]]],
+                table: TableClient, checkpoint: Checkpoint, rejects_path: str,
+                workers: int = DEFAULT_WORKERS, dry_run: bool = False, overwrite: bool = False) -> Dict[str, int]:
+    """Validates rows and writes them in transactions of 100, `workers` batches at a time.
+
+    With `overwrite` (admin rosters) rows are upserted. Otherwise they are only
+    created, and rows whose id is already taken (e.g. by a live ticket) are reported
+    as rejects. Memory stays constant: at most 2 x workers batches are in flight,
+    and rejected rows are streamed to a CSV report instead of being collected.
+    """
+    stats = {"imported": 0, "skipped": 0, "rejected": 0, "resumed_past": checkpoint.done_through}
+    in_flight: Dict[Future, Tuple[int, int]] = {}
+    batches: Dict[str, List[Tuple[int, Dict[str, Any]]]] = {}
+
+    def submit(pool: ThreadPoolExecutor, batch: List[Tuple[int, Dict[str, Any]]]):
+        first, last = batch[0][0], batch[-1][0]
+        checkpoint.started(first, last)
+        def write() -> List[Tuple[int, str]]:
+            if dry_run:
+                return []
+            if overwrite:
+                table.submit_transaction([("upsert", e, {"mode": UpdateMode.REPLACE}) for _, e in batch])
+                return []
+            return _create_rows(table, batch)
+        future = pool.submit(write)
+        in_flight[future] = (first, len(batch))
+        if len(in_flight) >= 2 * workers:
+            drain(wait(in_flight, return_when=FIRST_COMPLETED).done)
+
+    def drain(done):
+        for future in done:
+            first, count = in_flight.pop(future)
+            conflicts = future.result() # Surface failures; the checkpoint keeps the last safe row
+            checkpoint.finished(first)
+            for number, error in conflicts:
+                rejects.writerow([number, error])
+            stats["imported"] += count - len(conflicts)
+            stats["rejected"] += len(conflicts)
+
+    resuming = checkpoint.done_through > 0
+    with open(rejects_path, "a" if resuming else "w", newline="", encoding="utf-8") as rf, \
+            ThreadPoolExecutor(max_workers=workers) as pool:
+        rejects = csv.writer(rf)
+        if not resuming:
+            rejects.writerow(["row", "error"])
+        for number, row in rows:
+            if number <= checkpoint.done_through:
+                continue
+            try:
+                entity = to_entity(row)
+            except RowError as e:
+                rejects.writerow([number, str(e)])
+                stats["rejected"] += 1
+                continue
+            if entity is None:
+                stats["skipped"] += 1
+                continue
+            # Transactions must share a PartitionKey, so batches are built per partition
+            batch = batches.setdefault(entity["PartitionKey"], [])
+            batch.append((number, entity))
+            if len(batch) == BATCH_SIZE:
+                submit(pool, batches.pop(entity["PartitionKey"]))
+        for batch in list(batches.values()):
+            submit(pool, batch)
+        drain(wait(in_flight).done)
+    return stats
+
+
+def main(argv: Optional[List[str]] = None):
+    from azure_clients import (get_table_client, get_blob_client, GRIEVANCE_TABLE_NAME,
+                               ADMINS_TABLE_NAME, AGGREGATES_TABLE_NAME)
+
+    parser = argparse.ArgumentParser(description="Import grievances or admin rosters from Excel into Azure Tables.")
+    parser.add_argument("kind", choices=["grievances", "admins"])
+    parser.add_argument("workbook", help="Path to the .xlsx file (e.g. sample_grievances.xlsx).")
+    parser.add_argument("--sheet", help="Worksheet name (defaults to the active sheet).")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Parallel transactions in flight.")
+    parser.add_argument("--restart", action="store_true", help="Ignore the saved checkpoint and import from the top.")
+    parser.add_argument("--dry-run", action="store_true", help="Validate only; write nothing to Azure.")
+    parser.add_argument("--skip-aggregates", action="store_true", help="Don't rebuild the KPI aggregates afterwards.")
+    args = parser.parse_args(argv)
+
+    checkpoint = Checkpoint(None if args.dry_run else f"{args.workbook}.{args.kind}.checkpoint.json")
+    if args.restart:
+        checkpoint.clear()
+        checkpoint.done_through = 0
+    table_name = GRIEVANCE_TABLE_NAME if args.kind == "grievances" else ADMINS_TABLE_NAME
+    to_entity = grievance_entity if args.kind == "grievances" else admin_entity
+    rejects_path = f"{args.workbook}.{args.kind}.rejects.csv"
+
+    stats = import_rows(iter_rows(args.workbook, args.sheet), to_entity, get_table_client(table_name),
+                        checkpoint, rejects_path, workers=args.workers, dry_run=args.dry_run,
+                        overwrite=args.kind == "admins")
+    verb = "Validated" if args.dry_run else "✅ Imported"
+    print(f"{verb} {stats['imported']} {args.kind}, skipped {stats['skipped']}, rejected {stats['rejected']} "
+          f"(see {rejects_path}).")
+    if stats["resumed_past"]:
+        print(f"Resumed after row {stats['resumed_past']}.")
+
+    if not args.dry_run:
+        checkpoint.clear() # Completed: the next run starts from the top
+        from cache_coherence import publish_change
+        publish_change() # Running app instances drop their caches
+        if args.kind == "grievances" and not args.skip_aggregates:
+            import aggregates_store
+            from archive import get_archive_container, iter_archived_entities
+            n = aggregates_store.rebuild(get_table_client(GRIEVANCE_TABLE_NAME), get_table_client(AGGREGATES_TABLE_NAME),
+                                         archived=iter_archived_entities(get_archive_container(get_blob_client())))
+            print(f"✅ Rebuilt {n} aggregate buckets.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+import os
+import threading
+import time
+from typing import Callable, Optional
+
+from azure.core import MatchConditions
+from azure.core.exceptions import ResourceExistsError, ResourceModifiedError, ResourceNotFoundError
+from azure.data.tables import TableClient, UpdateMode
+
+# --------------------------------------------------------------------------------
+# CROSS-REPLICA CACHE COHERENCE (shared data version checked by every app instance)
+# --------------------------------------------------------------------------------
+# Writers bump a shared counter; each replica reads it at most once per interval
+# and drops its local caches only when the counter moved. The app's change poller
+# (snapshot_store.py) already picks up row writes, so the counter is bumped by the
+# bulk import / archive jobs, whose deletes and bulk loads need a full reload.
+# Backends: "table" (one entity in Azure Tables), "redis" (any Redis-compatible
+# server, needs the optional `redis` package) and "local" (in-process stand-in for
+# single-instance deployments and local development).
+CACHE_VERSION_BACKEND = os.getenv("CACHE_VERSION_BACKEND", "table")
+CACHE_VERSION_KEY = os.getenv("CACHE_VERSION_KEY", "grievances")
+CHECK_INTERVAL = float(os.getenv("CACHE_CHECK_INTERVAL", "5"))
+VERSION_PARTITION = "CACHE"
+MAX_RETRIES = 8
+
+
+class LocalVersionBackend:
+    """In-process version counter (no coordination across processes)."""
+
+    def __init__(self):
+        self._version = 0
+        self._lock = threading.Lock()
+
+    def read(self) -> int:
+        return self._version
+
+    def bump(self) -> int:
+        with self._lock:
+            self._version += 1
+            return self._version
+
+
+class TableVersionBackend:
+    """Version counter stored as a single entity, bumped with ETag optimistic concurrency."""
+
+    def __init__(self, table: TableClient, key: str = CACHE_VERSION_KEY):
+        self.table = table
+        self.key = key
+        self._table_ready = False
+
+    def _ensure_table(self):
+        # Nothing else creates the version table, so a fresh deployment needs it made here
+        if self._table_ready:
+            return
+        try:
+            self.table.create_table()
+        except ResourceExistsError:
+            pass
+        self._table_ready = True
+
+    def read(self) -> int:
+        self._ensure_table()
+        try:
+            entity = self.table.get_entity(partition_key=VERSION_PARTITION, row_key=self.key)
+        except ResourceNotFoundError:
+            return 0
+        return int(entity.get("version", 0) or 0)
+
+    def bump(self) -> int:
+        self._ensure_table()
+        for _ in range(MAX_RETRIES):
+            try:
+                current = self.table.get_entity(partition_key=VERSION_PARTITION, row_key=self.key)
+            except ResourceNotFoundError:
+                try:
+                    self.table.create_entity(entity={"PartitionKey": VERSION_PARTITION, "RowKey": self.key, "version": 1})
+                    return 1
+                except ResourceExistsError:
+                    continue # Another replica created it first; retry as an update
+            current["version"] = int(current.get("version", 0) or 0) + 1
+            try:
+                self.table.update_entity(entity=current, mode=UpdateMode.REPLACE,
+                                         etag=current.metadata["etag"], match_condition=MatchConditions.IfNotModified)
+                return current["version"]
+            except ResourceModifiedError:
+                continue # Concurrent bump; re-read and retry
+        raise RuntimeError(f"Could not bump cache version {self.key} after {MAX_RETRIES} attempts")
+
+
+class RedisVersionBackend:
+    """Version counter kept in a Redis-compatible server (INCR is atomic, no retries needed)."""
+
+    def __init__(self, url: str, key: str = CACHE_VERSION_KEY):
+        import redis # Optional dependency, only needed for this backend
+        self.client = redis.Redis.from_url(url)
+        self.key = f"cache-version:{key}"
+
+    def read(self) -> int:
+        return int(self.client.get(self.key) or 0)
+
+    def bump(self) -> int:
+        return int(self.client.incr(self.key))
+
+
+def backend_from_env():
+    """Builds the backend selected by CACHE_VERSION_BACKEND (table, redis or local)."""
+    if CACHE_VERSION_BACKEND == "redis":
+        return RedisVersionBackend(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+    if CACHE_VERSION_BACKEND == "table":
+        from azure_clients import get_table_client, CACHE_VERSION_TABLE_NAME
+        return TableVersionBackend(get_table_client(CACHE_VERSION_TABLE_NAME))
+    return LocalVersionBackend()
+
+
+def publish_change(backend=None) -> Optional[int]:
+    """Bumps the shared version after a write outside the app (import / archive jobs)."""
+    try:
+        return (backend or backend_from_env()).bump()
+    except Exception as e:
+        print(f"⚠️ Failed to publish cache version: {e}")
+        return None
+
+
+class CoherenceChecker:
+    """Tracks the shared version seen by this process and detects writes made elsewhere.
+
+    `check` reads the backend at most once per `interval` seconds (other callers
+    return immediately meanwhile), so the cost per replica is one point read per
+    interval regardless of the number of sessions.
+    """
+
+    def __init__(self, backend, interval: float = CHECK_INTERVAL, clock: Callable[[], float] = time.monotonic):
+        self.backend = backend
+        self.interval = interval
+        self.clock = clock
+        self.seen: Optional[int] = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+
+    def check(self) -> bool:
+        """True if another replica changed the data since the last check."""
+        now = self.clock()
+        if now < self._next_check or not self._lock.acquire(blocking=False):
+            return False
+        try:
+            self._next_check = now + self.interval
+            remote = self.backend.read()
+            changed = self.seen is not None and remote != self.seen
+            self.seen = remote
+            return changed
+        finally:
+            self._lock.release()
@@ -0,0 +1,150 @@
+import re
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+# --------------------------------------------------------------------------------
+# NEAR-DUPLICATE DETECTION (MinHash signatures + LSH banding over open tickets)
+# --------------------------------------------------------------------------------
+# Each ticket's title and the start of its description become a set of character
+# shingles; MinHash compresses the set to NUM_PERM integers whose agreement rate
+# estimates Jaccard similarity. LSH splits the signature into BANDS bands: tickets
+# sharing any band land in a common bucket, so a lookup only scores the few tickets
+# in its buckets instead of the whole ticket base. With 16 bands of 4 rows, pairs
+# at Jaccard 0.5 collide ~65% of the time and pairs at 0.8 ~99.9%.
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 3
+DESCRIPTION_CHARS = 300 # Only the start of long descriptions is compared
+DEFAULT_THRESHOLD = 0.5
+
+# Multiply-shift hashing of 63-bit shingle codes: h(x) = (a*x + b mod 2^64) >> 32, a odd
+_rng = np.random.default_rng(20251019) # Fixed seed: signatures must agree across processes
+_A = _rng.integers(0, 1 << 64, NUM_PERM, dtype=np.uint64) | np.uint64(1)
+_B = _rng.integers(0, 1 << 64, NUM_PERM, dtype=np.uint64)
+_SHIFT = np.uint64(32)
+_CHUNK_CHARS = 1 << 16 # Characters hashed per vectorised step (bounds the temporary arrays)
+_SPACE_RE = re.compile(r"[^\w]+")
+
+
+def normalise(title: Any, description: Any = "") -> str:
+    """Lower-cased title plus the start of the description, punctuation collapsed to spaces."""
+    text = f"{title or ''} {str(description or '')[:DESCRIPTION_CHARS]}"
+    text = _SPACE_RE.sub(" ", text.lower()).strip()
+    return text.ljust(SHINGLE_SIZE) if text else ""
+
+
+def _chunk_signatures(texts: List[str]) -> List[Optional[np.ndarray]]:
+    # Every character window of every text is encoded as one integer (3 x 21-bit code
+    # points), hashed NUM_PERM ways at once and reduced to per-text minima. Repeated
+    # shingles need no removing: they can't change a minimum.
+    lengths = np.array([len(t) for t in texts])
+    windows = np.maximum(lengths - SHINGLE_SIZE + 1, 0)
+    if not windows.any():
+        return [None] * len(texts)
+    chars = np.frombuffer("".join(texts).encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    n = len(chars) - SHINGLE_SIZE + 1
+    codes = chars[:n].copy()
+    for k in range(1, SHINGLE_SIZE):
+        codes = (codes << np.uint64(21)) | chars[k:n + k]
+    # Keep the windows that start and end inside the same text
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    keep = np.concatenate([np.arange(s, s + w) for s, w in zip(starts, windows) if w])
+    hashes = (_A[:, None] * codes[keep] + _B[:, None]) >> _SHIFT # (NUM_PERM, windows): rows are contiguous
+    offsets = np.concatenate(([0], np.cumsum(windows[windows > 0])[:-1]))
+    rows = iter(np.minimum.reduceat(hashes, offsets, axis=1).T)
+    return [next(rows) if w else None for w in windows]
+
+
+def signatures(texts: List[str]) -> List[Optional[np.ndarray]]:
+    """MinHash signatures of normalised texts (None for empty ones), hashed in vectorised chunks."""
+    out: List[Optional[np.ndarray]] = []
+    chunk: List[str] = []
+    size = 0
+    for text in texts:
+        chunk.append(text)
+        size += len(text)
+        if size >= _CHUNK_CHARS:
+            out.extend(_chunk_signatures(chunk))
+            chunk, size = [], 0
+    if chunk:
+        out.extend(_chunk_signatures(chunk))
+    return out
+
+
+def signature(title: Any, description: Any = "") -> Optional[np.ndarray]:
+    """MinHash signature of one ticket's text (None for empty text)."""
+    return signatures([normalise(title, description)])[0]
+
+
+def _bands(sig: np.ndarray) -> List[Tuple[int, bytes]]:
+    return [(b, sig[b * ROWS:(b + 1) * ROWS].tobytes()) for b in range(BANDS)]
+
+
+class DuplicateIndex:
+    """LSH index of open tickets, updated incrementally as tickets change."""
+
+    def __init__(self, id_field: str = "RowKey"):
+        self.id_field = id_field
+        self._signatures: Dict[str, np.ndarray] = {}
+        self._buckets: Dict[Tuple[int, bytes], Set[str]] = {}
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict[str, Any]], id_field: str = "RowKey") -> "DuplicateIndex":
+        index = cls(id_field)
+        open_records = [r for r in records if r.get(id_field) and r.get("status") != "Closed"]
+        sigs = signatures([normalise(r.get("title"), r.get("description")) for r in open_records])
+        for record, sig in zip(open_records, sigs):
+            index._add(str(record[id_field]), sig)
+        return index
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def upsert(self, record: Dict[str, Any]):
+        """Indexes an open ticket; a closed one is removed (it can't be a duplicate target)."""
+        doc_id = str(record.get(self.id_field, ""))
+        if not doc_id:
+            return
+        if record.get("status") == "Closed":
+            self.remove(doc_id)
+            return
+        sig = signature(record.get("title"), record.get("description"))
+        with self._lock:
+            self.remove(doc_id)
+            self._add(doc_id, sig)
+
+    def _add(self, doc_id: str, sig: Optional[np.ndarray]):
+        if sig is None:
+            return
+        with self._lock:
+            self._signatures[doc_id] = sig
+            for key in _bands(sig):
+                self._buckets.setdefault(key, set()).add(doc_id)
+
+    def remove(self, doc_id: str):
+        with self._lock:
+            sig = self._signatures.pop(doc_id, None)
+            if sig is None:
+                return
+            for key in _bands(sig):
+                bucket = self._buckets.get(key)
+                if bucket is not None:
+                    bucket.discard(doc_id)
+                    if not bucket:
+                        del self._buckets[key]
+
+    def similar(self, title: str, description: str = "", threshold: float = DEFAULT_THRESHOLD,
+                limit: int = 5) -> List[Tuple[str, float]]:
+        """Returns (id, estimated similarity) of open tickets likely to duplicate the text, best first."""
+        sig = signature(title, description)
+        if sig is None:
+            return []
+        with self._lock:
+            candidates = set().union(*(self._buckets.get(key, ()) for key in _bands(sig)))
+            scored = [(doc_id, float(np.mean(self._signatures[doc_id] == sig))) for doc_id in candidates]
+        scored = [(doc_id, score) for doc_id, score in scored if score >= threshold]
+        return sorted(scored, key=lambda item: -item[1])[:limit]
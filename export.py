@@ -0,0 +1,89 @@
+import csv
+import io
+import tempfile
+from datetime import datetime
+from typing import IO, Any, Dict, Iterable, Iterator, List, Set, Tuple
+
+import pandas as pd
+from azure.data.tables import TableClient
+from openpyxl import Workbook
+
+import text_codec
+
+# --------------------------------------------------------------------------------
+# STREAMING EXPORT (filtered grievance views to CSV / XLSX)
+# --------------------------------------------------------------------------------
+EXPORT_COLUMNS = ["RowKey", "title", "description", "category", "employee_name", "employee_email",
+                  "status", "assigned_to", "created_at", "updated_at", "comments"]
+EXPORT_HEADERS = ["ID", "Title", "Description", "Category", "Employee", "Employee Email",
+                  "Status", "Assigned To", "Created At", "Updated At", "Comments"]
+PAGE_SIZE = 1000
+FORMATS = {
+    "CSV": ("text/csv", "csv"),
+    "XLSX": ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "xlsx"),
+}
+
+
+def iter_table_rows(table: TableClient, ids: Set[str], page_size: int = PAGE_SIZE) -> Iterator[List[Any]]:
+    """Yields export rows for the given ids, reading the table one page at a time."""
+    select = EXPORT_COLUMNS + [c for c in text_codec.stored_columns() if c not in EXPORT_COLUMNS]
+    pages = table.query_entities("PartitionKey eq 'GRIEVANCE'", select=select,
+                                 results_per_page=page_size).by_page()
+    for page in pages:
+        for entity in page:
+            if entity.get("RowKey") in ids:
+                yield entity_row(entity)
+
+
+def iter_frame_rows(raw: pd.DataFrame, ids: Set[str]) -> Iterator[List[Any]]:
+    """Yields export rows for the given ids from a raw (RowKey-keyed) frame, e.g. an archive year."""
+    for entity in raw[raw["RowKey"].isin(ids)].to_dict("records"):
+        yield entity_row(entity)
+
+
+def entity_row(entity: Dict[str, Any]) -> List[Any]:
+    entity = next(text_codec.decode_entities([entity])) # Exports carry the full text
+    return ["" if entity.get(c) is None else str(entity.get(c)) for c in EXPORT_COLUMNS]
+
+
+def write_csv(rows: Iterable[List[Any]], out: io.BufferedIOBase) -> int:
+    """Writes rows as UTF-8 CSV (with BOM so Excel detects the encoding)."""
+    text = io.TextIOWrapper(out, encoding="utf-8-sig", newline="", write_through=True)
+    writer = csv.writer(text)
+    writer.writerow(EXPORT_HEADERS)
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+    text.detach() # Leave `out` open for the caller
+    return count
+
+
+def write_xlsx(rows: Iterable[List[Any]], out: io.BufferedIOBase) -> int:
+    """Writes rows through a write-only workbook, which streams rows instead of keeping them."""
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Grievances")
+    ws.append(EXPORT_HEADERS)
+    count = 0
+    for row in rows:
+        ws.append(row)
+        count += 1
+    wb.save(out)
+    return count
+
+
+def export_rows(rows: Iterable[List[Any]], fmt: str) -> Tuple[IO[bytes], int]:
+    """Writes rows in the given format to a temporary file; returns it (rewound) and the row count.
+
+    The file is deleted when closed or garbage-collected.
+    """
+    out = tempfile.TemporaryFile(prefix="grievances_", suffix=f".{FORMATS[fmt][1]}")
+    count = (write_xlsx if fmt == "XLSX" else write_csv)(rows, out)
+    out.flush()
+    out.seek(0)
+    return out, count
+
+
+def export_file_name(fmt: str) -> str:
+    return f"grievances_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{FORMATS[fmt][1]}"
+
@@ -0,0 +1,102 @@
+from typing import Any, Dict, List
+
+import pandas as pd
+
+# --------------------------------------------------------------------------------
+# GRIEVANCE SCHEMA (single source of truth for the typed DataFrame)
+# --------------------------------------------------------------------------------
+CATEGORIES = ["IT", "Facilities", "Finance", "HR", "Other"]
+STATUSES = ["Open", "WIP", "Closed"]
+
+# Column -> logical type. "category" columns listed in FIXED_CATEGORIES start from
+# the declared levels; any legacy values found in the data are appended, never dropped.
+GRIEVANCE_SCHEMA: Dict[str, str] = {
+    "id": "text",
+    "title": "text",
+    "description": "text",
+    "category": "category",
+    "employee_name": "category",
+    "employee_email": "category",
+    "status": "category",
+    "assigned_to": "category",
+    "created_at": "datetime",
+    "updated_at": "datetime",
+    "comments": "text",
+    "attachments": "text",
+}
+FIXED_CATEGORIES: Dict[str, List[str]] = {
+    "category": CATEGORIES,
+    "status": STATUSES,
+}
+DEFAULTS: Dict[str, str] = {"status": "Open"}
+DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Derived column used for case-insensitive ownership checks (employee view).
+EMAIL_LOWER_COLUMN = "employee_email_lower"
+
+GRIEVANCE_COLUMNS = list(GRIEVANCE_SCHEMA) + [EMAIL_LOWER_COLUMN]
+
+
+def _categorical(values: pd.Series, levels: List[str]) -> pd.Series:
+    """Builds a categorical column from declared levels plus any extra observed values."""
+    extras = sorted(set(values.unique()) - set(levels))
+    return values.astype(pd.CategoricalDtype(levels + extras))
+
+
+def to_typed_frame(records: List[Dict[str, Any]]) -> pd.DataFrame:
+    """Converts raw table entities into the typed grievance DataFrame.
+
+    The frame is indexed by grievance id (the `id` column is kept as well), so
+    callers can look rows up with `df.loc[ids]`.
+    """
+    df = pd.DataFrame(records)
+
+    # Rename RowKey to id for compatibility with grievence_2's logic
+    if "RowKey" in df.columns:
+        df = df.rename(columns={"RowKey": "id"})
+
+    out = pd.DataFrame(index=df.index)
+    for col, kind in GRIEVANCE_SCHEMA.items():
+        raw = df[col] if col in df.columns else pd.Series("", index=df.index, dtype=object)
+        if kind == "datetime":
+            out[col] = pd.to_datetime(raw, format=DATETIME_FORMAT, errors="coerce")
+            # Fall back to the flexible parser only for values the fast path missed
+            missed = out[col].isna() & raw.notna() & (raw.astype(str) != "")
+            if missed.any():
+                out.loc[missed, col] = pd.to_datetime(raw[missed], errors="coerce")
+            continue
+
+        values = raw.fillna(DEFAULTS.get(col, "")).astype(str)
+        if kind == "category":
+            out[col] = _categorical(values, FIXED_CATEGORIES.get(col, []))
+        else:
+            out[col] = values
+
+    out[EMAIL_LOWER_COLUMN] = out["employee_email"].str.lower().astype("category")
+    out.index = pd.Index(out["id"].to_numpy(), dtype=object)
+    return out
+
+
+def upsert_rows(df: pd.DataFrame, records: List[Dict[str, Any]]) -> pd.DataFrame:
+    """Returns a typed frame with the rows for `records` replaced (or appended).
+
+    Only the changed records are converted; categorical columns are widened to the
+    union of both sides' levels so the result keeps the schema's dtypes.
+    """
+    new = to_typed_frame(records)
+    kept = df[~df.index.isin(new.index)]
+    if kept.empty:
+        return new
+    kept, new = kept.copy(), new.copy()
+    for col in kept.columns:
+        if isinstance(kept[col].dtype, pd.CategoricalDtype):
+            extra = [c for c in new[col].cat.categories if c not in kept[col].cat.categories]
+            levels = list(kept[col].cat.categories) + extra
+            kept[col] = kept[col].cat.set_categories(levels)
+            new[col] = new[col].cat.set_categories(levels)
+    return pd.concat([kept, new])
+
+
+def empty_frame() -> pd.DataFrame:
+    """Returns an empty DataFrame carrying the typed schema."""
+    return to_typed_frame([])
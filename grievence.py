@@ -1,16 +1,40 @@
 import os
 import io
+import hashlib
+import uuid
 import time 
+import threading
 import pandas as pd
 import streamlit as st
 from datetime import datetime
-from typing import List, Dict, Any 
+from typing import List, Dict, Any, Optional
 from dotenv import load_dotenv
-from azure.data.tables import TableServiceClient, TableEntity 
+from azure.data.tables import TableEntity 
+from azure.core.exceptions import ResourceExistsError
 from email_sender import send_email   
 from login_handler import handle_login_flow, REDIRECT_URI
+from grievance_schema import CATEGORIES, STATUSES, EMAIL_LOWER_COLUMN, to_typed_frame, upsert_rows, empty_frame
+from search_index import InvertedIndex
+from dedupe import DuplicateIndex
+from query_cache import LRUCache
+from snapshot_store import SnapshotStore, ChangePoller
+from admin_directory import AdminDirectory, admin_name
+from assignment import WorkloadBalancer
+from azure_clients import (
+    GRIEVANCE_TABLE_NAME, ADMINS_TABLE_NAME, AGGREGATES_TABLE_NAME,
+    SUBMISSIONS_TABLE_NAME, BLOB_CONTAINER_NAME, get_table_client, get_blob_client, connection_stats,
+)
+import aggregates_store
+import analytics
+import archive
+import export
+import cache_coherence
+import async_loader
+import submissions
+import text_codec
+import assignment
 # Add these imports at the top of app.py
-from azure.storage.blob import BlobServiceClient, generate_blob_sas, BlobSasPermissions
+from azure.storage.blob import generate_blob_sas, BlobSasPermissions
 from datetime import datetime, timedelta
 # --------------------------------------------------------------------------------
 # CONFIG / CONSTANTS (Merged)
@@ -18,13 +42,28 @@ from datetime import datetime, timedelta
 load_dotenv()
 
 # --- Azure Config (from grievence_3) ---
-CONNECTION_STRING = os.getenv("CONNECTION_STRING", "")
-GRIEVANCE_TABLE_NAME = "Grievancesraised"
-ADMINS_TABLE_NAME = "adminsdetails"
+# CONNECTION_STRING, table/container names and client helpers live in azure_clients.py
 
 # --- App Config (from grievence_2) ---
-CATEGORIES = ["IT", "Facilities", "Finance", "HR", "Other"]
-STATUSES = ["Open", "WIP", "Closed"]
+# CATEGORIES / STATUSES now live in grievance_schema.py alongside the typed DataFrame schema
+
+# Fields covered by the search boxes (admins search everything, employees their own tickets)
+ADMIN_SEARCH_FIELDS = ["RowKey", "title", "description", "employee_name", "employee_email", "category", "assigned_to", "status"]
+EMPLOYEE_SEARCH_FIELDS = ["RowKey", "title", "description", "category", "status", "assigned_to"]
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "256"))
+
+# List pagination (rows rendered per page; the selector offers PAGE_SIZE_OPTIONS)
+PAGE_SIZE = int(os.getenv("GRIEVANCE_PAGE_SIZE", "25"))
+PAGE_SIZE_OPTIONS = sorted({10, 25, 50, 100, PAGE_SIZE})
+
+# Live updates: seconds between change polls (one per process) and between session checks
+POLL_INTERVAL = float(os.getenv("GRIEVANCE_POLL_INTERVAL", "10"))
+LIVE_REFRESH_INTERVAL = float(os.getenv("GRIEVANCE_LIVE_REFRESH_INTERVAL", "10"))
+# Seconds between log lines with the shared HTTP pool's opened/reused connections (0 = off)
+CONNECTION_STATS_INTERVAL = float(os.getenv("AZURE_CONNECTION_STATS_INTERVAL", "600"))
+
+# Values read concurrently on a cold start are only used if taken within this many seconds
+PREFETCH_MAX_AGE = 60
 
 # (ADMIN_EMAILS from grievence_2 is no longer needed as we fetch admins from Azure)
 
@@ -85,12 +124,6 @@ st.markdown("""
 .comment-meta { font-size: 0.85rem; color: #6b7280; margin-bottom: 5px; }
 </style>
 """, unsafe_allow_html=True)
-BLOB_CONTAINER_NAME = "grievanceattachements" # Your specified container name
-
-def get_blob_client() -> BlobServiceClient:
-    """Gets a client for the Azure Blob Storage service."""
-    # Reuses the existing CONNECTION_STRING (declared at the top of app.py)
-    return BlobServiceClient.from_connection_string(conn_str=CONNECTION_STRING)
 
 def upload_file_to_blob(file_obj: io.BytesIO, file_name: str) -> str:
     """Uploads a file object to Blob Storage and returns its full URL (without SAS)."""
@@ -119,13 +152,13 @@ def upload_file_to_blob(file_obj: io.BytesIO, file_name: str) -> str:
 # Azure Blob Helper Function (MODIFIED)
 # ---------------------------------------------------
 
-def generate_sas_url(blob_url: str) -> str:
+def generate_sas_url(blob_url: str, blob_service_client=None) -> str:
     """
     Generates a secure, short-lived SAS URL for a given blob URL, 
     setting content_disposition to 'inline' to encourage browser viewing.
     """
     try:
-        blob_service_client = get_blob_client()
+        blob_service_client = blob_service_client or get_blob_client()
         
         # Extract necessary parts from the blob URL
         blob_name = blob_url.split(f"/{BLOB_CONTAINER_NAME}/")[-1]
@@ -148,36 +181,38 @@ def generate_sas_url(blob_url: str) -> str:
         print(f"⚠️ Failed to generate SAS URL: {e}")
         return blob_url # Fallback to base URL (less secure)
 
+def generate_sas_urls(blob_urls: List[str]) -> List[str]:
+    """Signs several blob URLs with one client (signing is a local HMAC, no network calls)."""
+    try:
+        blob_service_client = get_blob_client()
+    except Exception as e:
+        print(f"⚠️ Failed to generate SAS URL: {e}")
+        return list(blob_urls)
+    return [generate_sas_url(url, blob_service_client) for url in blob_urls]
+
 # --------------------------------------------------------------------------------
 # EMAIL SENDER (from grievence_3, UPDATED to email all admins)
 # --------------------------------------------------------------------------------
 # --------------------------------------------------------------------------------
 # EMAIL SENDER (Final Update for 'email' column check)
 # --------------------------------------------------------------------------------
-def send_grievance_email(grievance_data: Dict[str, Any]):
-    """Automatically generate and send an HTML email to all admins with grievance details."""
+def send_grievance_email(grievance_data: Dict[str, Any], skip: Optional[set] = None, on_sent=None):
+    """Automatically generate and send an HTML email to all admins with grievance details.
+
+    Admins in `skip` were already notified (a resumed submission); `on_sent(email)` is
+    called after each successful send so the caller can record it. Returns True if
+    every remaining admin was emailed.
+    """
     try:
         sender_user_id = "So_App_Support@sonata-software.com"
 
-        # 1. Fetch admin entities using the existing cached function
-        all_admin_entities = fetch_all_admins()
-        admin_emails = []
-        for admin in all_admin_entities:
-            
-            # --- THE FIX ---
-            # Explicitly fetch the value from the 'email' column, which you confirmed is present.
-            email = admin.get("email")
-            # Fallback to RowKey only if 'email' is explicitly missing/empty.
-            if not email:
-                email = admin.get("RowKey")
-                
-            if email and "@" in email: # Simple validation
-                admin_emails.append(email)
-            # ---------------
+        # 1. Admin addresses ('email' column, else RowKey) from the shared admin directory
+        admin_emails = [email for email in get_admin_directory().notification_emails() if email not in (skip or ())]
 
         if not admin_emails:
-            print("⚠️ No admin emails found. Cannot send notification.")
-            return
+            if not skip:
+                print("⚠️ No admin emails found. Cannot send notification.")
+            return True
 
         grievance_id = grievance_data.get("RowKey", "")
         subject = f"New Grievance Raised - {grievance_id}"
@@ -188,14 +223,16 @@ def send_grievance_email(grievance_data: Dict[str, Any]):
         <p><strong>Grievance ID:</strong> {grievance_data.get("RowKey")}</p>
         <p><strong>Title:</strong> {grievance_data.get("title")}</p>
         <p><strong>Category:</strong> {grievance_data.get("category")}</p>
-        <p><strong>Description:</strong> {grievance_data.get("description")}</p>
+        <p><strong>Description:</strong> {text_codec.decode_field(grievance_data, "description")}</p>
         <p><strong>Employee:</strong> {grievance_data.get("employee_name")} ({grievance_data.get("employee_email")})</p>
         <p><strong>Created At:</strong> {grievance_data.get("created_at")}</p>
+        <p><strong>Assigned To:</strong> {grievance_data.get("assigned_to") or "Not assigned"}</p>
         <p style="color:gray;">Please log in to the Grievance Portal to view or assign this case.</p>
         </body></html>
         """
 
         # 2. Send to each admin individually
+        all_sent = True
         for email in admin_emails:
             try:
                 send_email(
@@ -205,83 +242,392 @@ def send_grievance_email(grievance_data: Dict[str, Any]):
                     html_body=html_body
                 )
                 print(f"✅ Email notification sent to {email}")
+                if on_sent:
+                    on_sent(email)
             except Exception as ex:
                 print(f"⚠️ Failed to send email to {email}: {ex}")
+                all_sent = False
+        return all_sent
 
     except Exception as e:
         print(f"⚠️ Top-level email sending failed: {e}")
+        return False
 
 
 # --------------------------------------------------------------------------------
 # TABLE HELPERS (from grievence_3, replacing Excel logic)
 # --------------------------------------------------------------------------------
 
-def get_table_client(name: str):
-    """Gets a client for a specific Azure Table."""
-    svc = TableServiceClient.from_connection_string(conn_str=CONNECTION_STRING)
-    return svc.get_table_client(name)
+@st.cache_resource
+def _admin_directory() -> AdminDirectory:
+    """Process-wide admin roster (see admin_directory.py), refreshed on read once its TTL passes."""
+    return AdminDirectory(lambda: get_table_client(ADMINS_TABLE_NAME))
+
+def get_admin_directory() -> AdminDirectory:
+    directory = _admin_directory()
+    seeded = _take_prefetched("admins")
+    if seeded is not None:
+        directory.seed(seeded)
+    return directory
+
+def apply_roster_name(user: Dict[str, Any]) -> Dict[str, Any]:
+    """Gives a logged-in admin their roster name (one directory lookup by email), so it
+    matches the "Assign to" list. Roles still come from the login (ADMIN_EMAILS)."""
+    if user.get("role") != "admin":
+        return user
+    try:
+        admin = get_admin_directory().by_email(user.get("email", ""))
+    except Exception as e:
+        print(f"⚠️ Admin lookup failed, keeping the login name: {e}")
+        return user
+    if admin is not None and user.get("name") != admin_name(admin):
+        user = {**user, "name": admin_name(admin)}
+        st.session_state.user = user
+    return user
 
-@st.cache_data
 def fetch_all_admins() -> List[Dict[str, Any]]:
-    """Fetches all admin user details from Azure Table."""
+    """Fetches all admin user details (from the admin directory cache)."""
     try:
-        table = get_table_client(ADMINS_TABLE_NAME)
-        # Assuming admins have a specific PartitionKey, e.g., 'ADMIN'
-        entities = table.query_entities(f"PartitionKey eq 'admin'")
-        return [dict(e) for e in entities]
+        return get_admin_directory().admins()
     except Exception as e:
         st.error(f"Error fetching admin list: {e}")
         return []
 
-@st.cache_data
 def fetch_all_grievances() -> List[Dict[str, Any]]:
-    """Fetches all grievances from Azure Table."""
+    """Returns all live grievances from the process-wide snapshot (see snapshot_store.py)."""
     try:
-        table = get_table_client(GRIEVANCE_TABLE_NAME)
-        entities = table.query_entities("PartitionKey eq 'GRIEVANCE'")
-        return [dict(e) for e in entities]
+        return _grievance_store().entities()
     except Exception as e:
         st.error(f"Error fetching grievances: {e}")
         return []
 
 def load_grievances_df() -> pd.DataFrame:
-    """Fetches grievances and converts to DataFrame for UI compatibility."""
-    grievances_list = fetch_all_grievances()
-    if not grievances_list:
-        # Return empty DataFrame with correct columns if no data
-        return pd.DataFrame(columns=[
-            "id", "title", "description", "category",
-            "employee_name", "employee_email",
-            "status", "assigned_to", "created_at", "updated_at",
-            "comments", "attachments", "RowKey"
-        ])
-    
-    df = pd.DataFrame(grievances_list)
-    
-    # Rename RowKey to id for compatibility with grievence_2's logic
-    if "RowKey" in df.columns:
-        df = df.rename(columns={"RowKey": "id"})
-    
-    # Ensure all columns from grievence_2 exist, fill with empty string if not
-    for col in ["comments", "assigned_to", "attachments", "status"]:
-            if col not in df.columns:
-                df[col] = ""
-    
-    # Fill NaNs in key columns to avoid errors
-    df['comments'] = df['comments'].fillna('')
-    df['assigned_to'] = df['assigned_to'].fillna('')
-    df['attachments'] = df['attachments'].fillna('')
-    df['status'] = df['status'].fillna('Open')
-    return df
-
-def clear_grievance_cache():
-    """Clears the grievance data cache."""
-    fetch_all_grievances.clear()
-    fetch_all_admins.clear()
-
-def generate_next_id(grievances: List[Dict[str, Any]]) -> str:
-    """Generates the next grievance ID (e.g., GRV_05)."""
-    max_num = 0
+    """Returns the typed DataFrame of the current snapshot (built once, then patched per change).
+
+    Column types are declared in grievance_schema.GRIEVANCE_SCHEMA: categorical
+    status/category/assigned_to, parsed created_at/updated_at and a pre-lowercased
+    employee email column, so views never re-parse or re-lowercase on rerun.
+    """
+    def build():
+        grievances_list = fetch_all_grievances()
+        if not grievances_list:
+            # Return empty DataFrame with correct columns if no data
+            return empty_frame()
+        return to_typed_frame(grievances_list)
+    def update(df, changes):
+        return upsert_rows(df, [after for _, after in changes])
+    try:
+        return _grievance_store().derived("frame", build, update)
+    except Exception as e:
+        st.error(f"Error fetching grievances: {e}")
+        return empty_frame()
+
+# --------------------------------------------------------------------------------
+# LIVE SNAPSHOT, CHANGE POLLER & SEARCH INDEX (process-wide, shared by all sessions)
+# --------------------------------------------------------------------------------
+@st.cache_resource
+def _search_index_state() -> Dict[str, Any]:
+    """Holds the inverted search index and the snapshot version it was built for."""
+    return {"version": None, "index": None, "lock": threading.Lock()}
+
+@st.cache_resource
+def _grievance_store() -> SnapshotStore:
+    """The process's single copy of the grievance table, kept fresh by one background poller.
+
+    Each poll is one Timestamp-filtered query, whatever the number of open sessions.
+    The shared cache version (cache_coherence.py) is checked on the same tick; it is
+    bumped by the import/archive jobs, whose bulk writes and deletes need a full reload.
+    Every CONNECTION_STATS_INTERVAL seconds the tick also logs the connection pool's reuse.
+    """
+    store = SnapshotStore(lambda: get_table_client(GRIEVANCE_TABLE_NAME))
+    index_state = _search_index_state()
+    store.subscribe(lambda previous, current, changes: _carry_forward_search_index(index_state, previous, current, changes))
+    checker = cache_coherence.CoherenceChecker(cache_coherence.backend_from_env(), interval=0)
+    next_stats = [time.monotonic() + CONNECTION_STATS_INTERVAL]
+
+    def tick():
+        if CONNECTION_STATS_INTERVAL and time.monotonic() >= next_stats[0]:
+            next_stats[0] = time.monotonic() + CONNECTION_STATS_INTERVAL
+            stats = connection_stats()
+            print(f"✅ Azure connections: {stats['opened']} opened, {stats['reused']} reused "
+                  f"over {stats['requests']} requests ({stats['hosts']} host pools)")
+        try:
+            full_reload = checker.check()
+        except Exception as e:
+            print(f"⚠️ Cache version check failed: {e}")
+            full_reload = False
+        if full_reload:
+            store.reload()
+            _admin_directory().reload() # The admin import also bumps the version
+            clear_archive_caches() # So does the archive job, which rewrites the year files
+        else:
+            store.poll()
+    ChangePoller(tick, POLL_INTERVAL).start()
+    return store
+
+@st.cache_resource
+def _prefetched() -> Dict[str, Any]:
+    """Start-up reads made by prefetch_dashboard, each taken once by the loader that needs it."""
+    return {}
+
+def _take_prefetched(name: str) -> Optional[Any]:
+    """Returns a prefetched value if it is fresh (seconds old); stale values are dropped."""
+    value, at = _prefetched().pop(name, (None, 0.0))
+    return value if time.monotonic() - at < PREFETCH_MAX_AGE else None
+
+def prefetch_dashboard(role: str, email: Optional[str] = None):
+    """Loads a cold dashboard's independent reads concurrently and seeds the caches with them.
+
+    Admins, grievances, the KPI bucket, the year buckets and the archived years are
+    awaited together (async_loader.py), so a cold start costs about the slowest
+    read instead of their sum. Warm processes return at once; anything that fails
+    here is simply loaded by the usual sync path.
+    """
+    store = _grievance_store()
+    if store.loaded:
+        return
+    is_admin = role == "admin"
+    row_key = (aggregates_store.bucket_row_key("all") if is_admin
+               else aggregates_store.bucket_row_key("employee", (email or "").lower()))
+    try:
+        results = async_loader.run_load_dashboard(admins=is_admin, grievances=True, count_keys=[row_key],
+                                                  year_buckets=is_admin, archived_years=is_admin)
+    except Exception as e:
+        print(f"⚠️ Concurrent dashboard load failed, loading sequentially: {e}")
+        return
+    for name, value in list(results.items()):
+        if isinstance(value, Exception):
+            print(f"⚠️ Concurrent load of {name} failed: {value}")
+            del results[name]
+
+    if "grievances" in results and store.seed(results["grievances"]) and ("counts", row_key) in results:
+        _query_result_cache().put((store.version, "aggregates", row_key), results[("counts", row_key)])
+    now = time.monotonic()
+    _prefetched().update({name: (results[name], now) for name in ["admins", "year_buckets", "archived_years"]
+                          if name in results})
+
+def snapshot_version() -> int:
+    """Returns the version of the grievance snapshot currently served by this process."""
+    store = _grievance_store()
+    store.ensure_loaded()
+    return store.version
+
+def get_search_index() -> InvertedIndex:
+    """Returns the search index for the current snapshot, building it once per snapshot."""
+    state = _search_index_state()
+    version = snapshot_version()
+    with state["lock"]:
+        if state["index"] is None or state["version"] != version:
+            records = text_codec.decode_entities(fetch_all_grievances()) # Search covers the full text
+            state["index"] = InvertedIndex.from_records(records, ADMIN_SEARCH_FIELDS)
+            state["version"] = version
+        return state["index"]
+
+def search_grievance_ids(query: str, fields: List[str]) -> set:
+    """Returns the ids of grievances matching every term of the query (prefix match)."""
+    return get_search_index().search(query, fields)
+
+def _carry_forward_search_index(state: Dict[str, Any], previous: int, current: int, changes: List[tuple]):
+    """Applies merged entities to the index so a change does not force a full rebuild."""
+    with state["lock"]:
+        if state["index"] is None or state["version"] != previous:
+            return # Stale or never built: the next search rebuilds it
+        for _, entity in changes:
+            state["index"].upsert(next(text_codec.decode_entities([entity])))
+        state["version"] = current
+
+def clear_grievance_cache(changed: Optional[List[Dict[str, Any]]] = None):
+    """Refreshes the grievance snapshot and starts a new snapshot version.
+
+    `changed` lists the entities written by this process; they are merged into the
+    snapshot (and derived structures patched) without re-reading the table.
+    Without it the table is read in full.
+    """
+    store = _grievance_store()
+    if changed:
+        store.apply(changed)
+    else:
+        store.reload()
+
+# --------------------------------------------------------------------------------
+# QUERY PIPELINE (year / status / search / sort, cached per snapshot version)
+# --------------------------------------------------------------------------------
+@st.cache_resource
+def _query_result_cache() -> LRUCache:
+    """Process-wide LRU of view results keyed by (snapshot version, view inputs)."""
+    return LRUCache(QUERY_CACHE_SIZE)
+
+def _scoped_df(role: str, email: Optional[str]) -> pd.DataFrame:
+    """Rows visible to a view: admins see every dated ticket, employees their own."""
+    df = load_grievances_df()
+    if role == "admin":
+        return df.dropna(subset=["created_at"]) # Drop rows where date conversion failed
+    return df[df[EMAIL_LOWER_COLUMN] == (email or "").lower()]
+
+def _year_slice(df: pd.DataFrame, year: str) -> pd.DataFrame:
+    if year == "All":
+        return df
+    return df[df["created_at"].dt.year == int(year)]
+
+# --- Archived years (cold tier, see archive.py): loaded lazily, one year at a time ---
+@st.cache_data(ttl=3600)
+def fetch_archived_years() -> List[int]:
+    """Lists the years with an archive file in Blob storage."""
+    seeded = _take_prefetched("archived_years")
+    if seeded is not None:
+        return seeded
+    try:
+        return archive.list_archived_years(archive.get_archive_container(get_blob_client()))
+    except Exception as e:
+        print(f"⚠️ Failed to list archived years: {e}")
+        return []
+
+@st.cache_data(ttl=3600, max_entries=8)
+def load_archived_year_df(year: int) -> pd.DataFrame:
+    """Downloads one archived year and converts it to the typed DataFrame."""
+    try:
+        raw = archive.read_archive(archive.get_archive_container(get_blob_client()), year)
+    except Exception as e:
+        st.error(f"Error loading archived grievances for {year}: {e}")
+        return empty_frame()
+    return to_typed_frame(raw) if len(raw) else empty_frame()
+
+@st.cache_resource(ttl=3600, max_entries=8)
+def _archived_year_index(year: int) -> InvertedIndex:
+    """Search index over one archived year (archives only change when the job runs)."""
+    records = load_archived_year_df(year).rename(columns={"id": "RowKey"}).to_dict("records")
+    return InvertedIndex.from_records(records, ADMIN_SEARCH_FIELDS)
+
+def clear_archive_caches():
+    """Drops the cached archive listings, year frames and indexes (after an archive run)."""
+    fetch_archived_years.clear()
+    load_archived_year_df.clear()
+    _archived_year_index.clear()
+
+def _is_archived_year(year: str) -> bool:
+    return year != "All" and int(year) in fetch_archived_years()
+
+def grievance_view_frame(role: str, email: Optional[str], year: str) -> pd.DataFrame:
+    """Rows a view can list for a year: the live snapshot plus, for admins, that year's archive."""
+    live = _year_slice(_scoped_df(role, email), year)
+    if role != "admin" or not _is_archived_year(year):
+        return live
+    def compute():
+        cold = load_archived_year_df(int(year))
+        cold = cold[~cold.index.isin(live.index)]
+        return pd.concat([live, cold]) if len(cold) else live
+    return _query_result_cache().get_or_compute((snapshot_version(), "frame", year), compute)
+
+def grievance_years() -> List[int]:
+    """Returns the years present in the admin view (live and archived), newest first.
+
+    Read from the aggregates "year" buckets when available, else from the snapshot.
+    """
+    key = (snapshot_version(), "years")
+    def compute():
+        try:
+            buckets = _take_prefetched("year_buckets")
+            if buckets is None:
+                buckets = aggregates_store.read_dimension(get_table_client(AGGREGATES_TABLE_NAME), "year")
+            years = [int(y) for y, counts in buckets.items() if counts["Raised"] > 0]
+        except Exception:
+            buckets = None
+        if not buckets:
+            years = _scoped_df("admin", None)["created_at"].dt.year.unique()
+        years = set(int(y) for y in years) | set(fetch_archived_years())
+        return tuple(sorted(years, reverse=True))
+    return list(_query_result_cache().get_or_compute(key, compute))
+
+def grievance_status_counts(role: str, email: Optional[str] = None, year: str = "All") -> Dict[str, int]:
+    """Returns Raised/Closed/WIP/Open counts for a view."""
+    key = (snapshot_version(), "counts", role, email, year)
+    def compute():
+        status = grievance_view_frame(role, email, year)["status"]
+        counts = status.value_counts()
+        return {
+            "Raised": len(status),
+            **{s: int(counts.get(s, 0)) for s in ["Closed", "WIP", "Open"]},
+        }
+    return dict(_query_result_cache().get_or_compute(key, compute))
+
+def query_grievance_ids(role: str, email: Optional[str], year: str, status: str, query: str) -> List[str]:
+    """Returns matching grievance ids sorted newest first.
+
+    Results are cached by (snapshot version, role, email, year, status, query), so
+    reruns that don't change these inputs (e.g. opening a dialog) skip the pipeline.
+    """
+    query = " ".join(query.lower().split())
+    key = (snapshot_version(), "ids", role, email, year, status, query)
+    def compute():
+        df = grievance_view_frame(role, email, year)
+        if status != "All":
+            df = df[df["status"] == status]
+        if query:
+            fields = ADMIN_SEARCH_FIELDS if role == "admin" else EMPLOYEE_SEARCH_FIELDS
+            hits = search_grievance_ids(query, fields)
+            if role == "admin" and _is_archived_year(year):
+                hits = hits | _archived_year_index(int(year)).search(query, fields)
+            df = df[df.index.isin(hits)]
+        return tuple(df.sort_values("created_at", ascending=False).index)
+    return list(_query_result_cache().get_or_compute(key, compute))
+
+# --------------------------------------------------------------------------------
+# AGGREGATES (materialised KPI counts, see aggregates_store.py)
+# --------------------------------------------------------------------------------
+def record_aggregates(before: Optional[Dict[str, Any]], after: Dict[str, Any]):
+    """Updates the aggregates table for a grievance write. Failures only cause drift,
+    which `python aggregates_store.py rebuild` repairs, so they never block the write."""
+    try:
+        aggregates_store.record_change(get_table_client(AGGREGATES_TABLE_NAME), before, after)
+    except Exception as e:
+        print(f"⚠️ Failed to update aggregates for {after.get('RowKey')}: {e}")
+
+def dashboard_counts(role: str, email: Optional[str] = None, year: str = "All") -> Dict[str, int]:
+    """Returns KPI counts for a dashboard header with one small aggregates read.
+
+    The buckets cover the full history, archived tickets included (see archive_note).
+    Falls back to counting the snapshot when the bucket is missing (table not built
+    yet, or an employee without tickets) or the aggregates table can't be read.
+    """
+    if role == "admin":
+        row_key = aggregates_store.bucket_row_key("all") if year == "All" else aggregates_store.bucket_row_key("year", year)
+    else:
+        row_key = aggregates_store.bucket_row_key("employee", (email or "").lower())
+
+    def compute():
+        try:
+            return aggregates_store.read_counts(get_table_client(AGGREGATES_TABLE_NAME), row_key)
+        except Exception as e:
+            print(f"⚠️ Failed to read aggregates: {e}")
+            return None
+
+    counts = _query_result_cache().get_or_compute((snapshot_version(), "aggregates", row_key), compute)
+    if counts is None:
+        return grievance_status_counts(role, email, year)
+    return dict(counts)
+
+def archive_note(counts: Dict[str, int], role: str, email: Optional[str] = None, year: str = "All"):
+    """Labels a full-history header when it counts more tickets than the live list below it."""
+    if year != "All" or counts.get("Raised", 0) <= grievance_status_counts(role, email, year)["Raised"]:
+        return
+    if role == "admin":
+        st.caption("Counts include archived tickets, which the list below shows only when their year is selected.")
+    else:
+        st.caption("Counts include your archived (older closed) tickets, which are not listed below.")
+
+def archived_id_high_water() -> int:
+    """Highest id number ever archived: ids up to it must not be issued again."""
+    table = get_table_client(GRIEVANCE_TABLE_NAME)
+    mark = archive.read_id_high_water(table)
+    if mark is None:
+        # Archives written before the mark existed: take it from the files, once
+        archived = archive.iter_archived_entities(archive.get_archive_container(get_blob_client()))
+        mark = archive.raise_id_high_water(table, max((archive.grievance_id_number(e["RowKey"]) for e in archived), default=0))
+    return mark
+
+def generate_next_id(grievances: List[Dict[str, Any]], floor: int = 0) -> str:
+    """Generates the next grievance ID (e.g., GRV_05), above `floor` (the archived-id mark)."""
+    max_num = floor
     for g in grievances:
         gid = g.get("RowKey", "")
         if gid.startswith("GRV_"):
@@ -291,8 +637,39 @@ def generate_next_id(grievances: List[Dict[str, Any]]) -> str:
             except: pass
     return f"GRV_{max_num + 1:03d}" # Padded to 3 digits
 
-def create_grievance(new_id: str, title: str, desc: str, category: str, name: str, email: str, attachments: List[str]):
-    """Creates a new grievance entity in Azure Table."""
+# --------------------------------------------------------------------------------
+# AUTO-ASSIGNMENT (least-loaded admin per category, see assignment.py)
+# --------------------------------------------------------------------------------
+def get_workload_balancer() -> WorkloadBalancer:
+    """Returns the open-ticket balancer for the current snapshot and admin roster.
+
+    Ticket changes are applied from the snapshot's change log and the roster is
+    re-read only when the admin directory's version moves.
+    """
+    def update(balancer, changes):
+        balancer.apply(changes)
+        return balancer
+    balancer = _grievance_store().derived("assignment", lambda: WorkloadBalancer.from_records(fetch_all_grievances()), update)
+    directory = get_admin_directory()
+    directory.ensure_fresh()
+    version = directory.version
+    if balancer.roster_version != version:
+        balancer.set_roster(directory.admins(), version)
+    return balancer
+
+def auto_assign(grievance_id: str, category: str) -> str:
+    """Name of the admin a new ticket goes to ("" when auto-assignment is off or nobody qualifies)."""
+    if not assignment.AUTO_ASSIGN:
+        return ""
+    try:
+        return get_workload_balancer().assign(grievance_id, category) or ""
+    except Exception as e:
+        print(f"⚠️ Auto-assignment failed for {grievance_id}, leaving it unassigned: {e}")
+        return ""
+
+def create_grievance(new_id: str, title: str, desc: str, category: str, name: str, email: str, attachments: List[str],
+                     idempotency_key: str = "") -> Dict[str, Any]:
+    """Creates a new grievance entity in Azure Table (ResourceExistsError if the id is taken)."""
     table = get_table_client(GRIEVANCE_TABLE_NAME)
     now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
@@ -305,15 +682,108 @@ def create_grievance(new_id: str, title: str, desc: str, category: str, name: st
         "employee_name": name,
         "employee_email": email,
         "status": "Open",
-        "assigned_to": "",
+        "assigned_to": auto_assign(new_id, category),
         "created_at": now,
         "updated_at": now,
         "comments": "",
         "attachments": ";".join(attachments),
+        "idempotency_key": idempotency_key, # Ties the ticket to its submission (see submit_grievance)
     }
-    table.create_entity(entity=entity)
-    send_grievance_email(entity) # Send email on creation
-    clear_grievance_cache()
+    try:
+        entity = text_codec.encode_entity(entity) # Long text is stored compressed
+        table.create_entity(entity=entity)
+    except Exception:
+        get_workload_balancer().release(new_id)
+        raise
+    record_aggregates(None, entity)
+    clear_grievance_cache(changed=[entity])
+    return entity
+
+# --------------------------------------------------------------------------------
+# IDEMPOTENT SUBMISSION (outbox record per form submission, see submissions.py)
+# --------------------------------------------------------------------------------
+@st.cache_resource
+def _submissions_table():
+    return submissions.ensure_table(get_table_client(SUBMISSIONS_TABLE_NAME))
+
+def upload_attachments(grievance_id: str, files, key: str) -> List[str]:
+    """Uploads the form's files as GRV_XXX-<key>_filename.ext blobs (re-uploading overwrites, never duplicates).
+
+    The submission key in the name keeps two submissions that reserved the same id
+    from writing (or later deleting) each other's files.
+    """
+    attachments = []
+    for f in files or []:
+        safe_name = "".join(c for c in f.name if c.isalnum() or c in ('.', '_', '-')).strip()
+        blob_url = upload_file_to_blob(f, f"{grievance_id}-{key[:8]}_{safe_name}")
+        if blob_url:
+            attachments.append(blob_url)
+        else:
+            st.warning(f"Could not save attachment {f.name} to Azure.")
+    return attachments
+
+def delete_blobs(blob_urls: List[str]):
+    """Best-effort removal of this submission's uploads that no ticket will reference."""
+    container_client = get_blob_client().get_container_client(BLOB_CONTAINER_NAME)
+    for url in blob_urls:
+        try:
+            container_client.delete_blob(url.rsplit("/", 1)[-1])
+        except Exception as e:
+            print(f"⚠️ Failed to delete orphan blob {url}: {e}")
+
+def submission_record(key: str) -> Optional[Dict[str, Any]]:
+    """Outbox record of a submission that was already started, else None."""
+    return submissions.get_submission(_submissions_table(), key)
+
+def submit_grievance(key: str, title: str, desc: str, category: str, user: Dict[str, Any], files) -> tuple:
+    """Runs the submission pipeline for one idempotency key; returns (grievance id, fully done).
+
+    Each step is recorded in the outbox before the next starts, so calling it again
+    with the same key (double click, retry after an error) skips what already happened:
+    blobs are not re-uploaded, the ticket is not created twice and admins who were
+    already emailed are not emailed again. If some admin emails fail, the submission
+    stays open and the next call retries only those.
+    """
+    table = _submissions_table()
+    record = submissions.get_submission(table, key)
+    if submissions.stage_reached(record, "notified"):
+        return record["grievance_id"], True
+    if record is None:
+        record = submissions.reserve(table, key, generate_next_id(fetch_all_grievances(), archived_id_high_water()), user["email"])
+
+    entity = None
+    while entity is None:
+        gid = record["grievance_id"]
+        if not submissions.stage_reached(record, "uploaded"):
+            record = submissions.advance(table, record, attachments=upload_attachments(gid, files, key), stage="uploaded")
+        attachments = submissions.split_list(record.get("attachments"))
+        if submissions.stage_reached(record, "created"):
+            entity = get_table_client(GRIEVANCE_TABLE_NAME).get_entity(partition_key="GRIEVANCE", row_key=gid)
+            break
+        try:
+            entity = create_grievance(gid, title, desc, category, user["name"], user["email"], attachments, key)
+        except ResourceExistsError:
+            existing = get_table_client(GRIEVANCE_TABLE_NAME).get_entity(partition_key="GRIEVANCE", row_key=gid)
+            if existing.get("idempotency_key") == key:
+                entity = existing # Created by an earlier attempt that failed before recording it
+                break
+            # Another submission took this id: drop our blobs (only names carrying our key) and move to a fresh id
+            delete_blobs([url for url in attachments if f"{gid}-{key[:8]}_" in url.rsplit("/", 1)[-1]])
+            _grievance_store().poll()
+            next_id = generate_next_id(fetch_all_grievances() + [{"RowKey": gid}], archived_id_high_water())
+            record = submissions.advance(table, record, grievance_id=next_id, attachments=[], stage="reserved")
+    if not submissions.stage_reached(record, "created"):
+        record = submissions.advance(table, record, stage="created")
+
+    notified = set(submissions.split_list(record.get("notified")))
+    def mark_sent(email: str):
+        nonlocal record
+        notified.add(email)
+        record = submissions.advance(table, record, notified=sorted(notified))
+    if not send_grievance_email(entity, skip=notified, on_sent=mark_sent):
+        return entity["RowKey"], False
+    submissions.advance(table, record, stage="notified")
+    return entity["RowKey"], True
 
 def update_grievance_entity(grievance_id: str, updates: Dict[str, Any]):
     """Updates a single grievance entity in Azure Table."""
@@ -321,16 +791,19 @@ def update_grievance_entity(grievance_id: str, updates: Dict[str, Any]):
         table = get_table_client(GRIEVANCE_TABLE_NAME)
         # All grievances use 'GRIEVANCE' as PartitionKey
         entity = table.get_entity(partition_key="GRIEVANCE", row_key=grievance_id)
+        before = dict(entity)
         
         # Apply updates
         for key, value in updates.items():
             entity[key] = value
+        entity = text_codec.encode_entity(entity, [f for f in text_codec.LARGE_TEXT_FIELDS if f in updates])
         
         # Add update timestamp
         entity["updated_at"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         
         table.update_entity(entity=entity, mode="replace")
-        clear_grievance_cache() # Clear cache after update
+        record_aggregates(before, entity)
+        clear_grievance_cache(changed=[entity]) # Clear cache after update
     except Exception as e:
         st.error(f"Failed to update grievance: {e}")
         st.stop()
@@ -384,13 +857,13 @@ def logout_btn():
 # -------------------------------
 # Stats (from grievence_2, requires DataFrame)
 # -------------------------------
-def stats_kpis(df: pd.DataFrame):
-    """Displays KPI cards for grievance counts."""
+def stats_kpis(counts: Dict[str, int]):
+    """Displays KPI cards for grievance counts (see grievance_status_counts)."""
     col1, col2, col3, col4 = st.columns(4)
-    total_count = len(df)
-    closed_count = (df["status"]=="Closed").sum()
-    wip_count = (df["status"]=="WIP").sum()
-    open_count = (df["status"]=="Open").sum()
+    total_count = counts.get("Raised", 0)
+    closed_count = counts.get("Closed", 0)
+    wip_count = counts.get("WIP", 0)
+    open_count = counts.get("Open", 0)
 
     with col1:
         st.markdown(f'<div class="kpi-card"><div class="kpi-title">Raised</div><div class="kpi-value">{total_count}</div></div>', unsafe_allow_html=True)
@@ -402,21 +875,280 @@ def stats_kpis(df: pd.DataFrame):
         st.markdown(f'<div class="kpi-card"><div class="kpi-title">Open</div><div class="kpi-value">{open_count}</div></div>', unsafe_allow_html=True)
 
 
+# -------------------------------
+# Pagination (only the current page of a result list is rendered)
+# -------------------------------
+def paginate(ids: List[str], key: str, inputs: tuple) -> List[str]:
+    """Renders pager controls for a sorted id list and returns the ids on the current page.
+
+    The page resets to the first one whenever `inputs` (the filter/search values
+    that produced `ids`) change.
+    """
+    page_key, size_key, inputs_key = f"{key}_page", f"{key}_page_size", f"{key}_page_inputs"
+    if st.session_state.get(inputs_key) != inputs:
+        st.session_state[inputs_key] = inputs
+        st.session_state[page_key] = 0
+
+    page_size = st.session_state.get(size_key, PAGE_SIZE)
+    page_count = max(1, -(-len(ids) // page_size))
+    page = min(st.session_state.get(page_key, 0), page_count - 1)
+    start = page * page_size
+    end = min(start + page_size, len(ids))
+
+    def set_page(p: int):
+        st.session_state[page_key] = p
+
+    nav_prev, nav_info, nav_next, nav_size = st.columns([0.15, 0.5, 0.15, 0.2])
+    nav_prev.button("◀ Prev", key=f"{key}_prev", disabled=page == 0,
+                    on_click=set_page, args=(page - 1,), use_container_width=True)
+    nav_info.markdown(
+        f'<p class="small-muted" style="text-align:center;">Showing {start + 1}–{end} of {len(ids)} · Page {page + 1} of {page_count}</p>',
+        unsafe_allow_html=True,
+    )
+    nav_next.button("Next ▶", key=f"{key}_next", disabled=page >= page_count - 1,
+                    on_click=set_page, args=(page + 1,), use_container_width=True)
+    nav_size.selectbox("Rows per page", PAGE_SIZE_OPTIONS, index=PAGE_SIZE_OPTIONS.index(page_size),
+                       key=size_key, label_visibility="collapsed",
+                       on_change=set_page, args=(0,))
+    return ids[start:end]
+
+def rows_for_ids(df: pd.DataFrame, ids: List[str]) -> pd.DataFrame:
+    """Returns the rows for ids in order, skipping ids no longer in the snapshot."""
+    return df.loc[[i for i in ids if i in df.index]]
+
+
+# -------------------------------
+# Live updates (sessions rerun only when a polled change touches their view)
+# -------------------------------
+def _entity_in_view(entity: Dict[str, Any], role: str, email: Optional[str], year: str) -> bool:
+    """True if the entity counts towards a view (its list or its KPI cards)."""
+    if role != "admin" and str(entity.get("employee_email", "")).lower() != (email or "").lower():
+        return False
+    return year == "All" or str(entity.get("created_at", "")).startswith(year)
+
+def open_grievance_dialog(grievance_id: str, year: str = "All"):
+    """Opens the details dialog, noting the run it belongs to so live updates don't close it."""
+    st.session_state["dialog_run"] = st.session_state.get("full_runs", 0) + 1 # The run this callback precedes
+    grievance_dialog_content(grievance_id, year)
+
+@st.fragment(run_every=LIVE_REFRESH_INTERVAL)
+def live_updates(role: str, email: Optional[str], year: str = "All"):
+    """Reruns the page when the snapshot has changed in a way that affects this view.
+
+    Runs with the page (recording the version it was rendered from) and then on its
+    own every LIVE_REFRESH_INTERVAL seconds, comparing against the process-wide
+    snapshot that the change poller keeps current; no table reads happen here.
+    """
+    full_run = st.session_state.get("full_runs", 0)
+    current = snapshot_version()
+    if st.session_state.get("live_run") != full_run:
+        st.session_state["live_run"] = full_run
+        st.session_state["live_seen_version"] = current
+        return
+
+    seen = st.session_state.get("live_seen_version", current)
+    if seen == current:
+        return
+    changes = _grievance_store().changes_since(seen)
+    affected = changes is None or any(
+        e is not None and _entity_in_view(e, role, email, year) for change in changes for e in change)
+    if not affected:
+        st.session_state["live_seen_version"] = current
+        return
+    if st.session_state.get("dialog_run") == full_run:
+        # A dialog may still be open and a rerun would close it: wait for the next action
+        st.caption("🔄 New updates are available and will show after your next action.")
+        return
+    st.rerun()
+
+
+# -------------------------------
+# Near-duplicate detection (MinHash/LSH over open tickets, see dedupe.py)
+# -------------------------------
+def get_duplicate_index() -> DuplicateIndex:
+    """Returns the duplicate index for the current snapshot, patched per change rather than rebuilt."""
+    def update(index, changes):
+        for _, entity in changes:
+            index.upsert(entity)
+        return index
+    return _grievance_store().derived("dedupe", lambda: DuplicateIndex.from_records(fetch_all_grievances()), update)
+
+def find_duplicates(title: str, desc: str) -> List[Dict[str, Any]]:
+    """Returns open grievances that look like the same issue as the given text, best first."""
+    df = load_grievances_df()
+    matches = [(gid, score) for gid, score in get_duplicate_index().similar(title, desc) if gid in df.index]
+    return [dict(df.loc[gid].to_dict(), similarity=score) for gid, score in matches]
+
+def warn_if_duplicate(title: str, desc: str, user_email: str) -> bool:
+    """Shows likely duplicates before a submission; returns True if the submission should wait.
+
+    The warning is shown once per text: submitting the same title and description
+    again raises the grievance anyway.
+    """
+    fingerprint = hashlib.sha1(f"{title.strip()}\n{desc.strip()}".encode("utf-8")).hexdigest()
+    if st.session_state.get("duplicate_ack") == fingerprint:
+        return False
+    try:
+        duplicates = find_duplicates(title, desc)
+    except Exception as e:
+        print(f"⚠️ Duplicate check failed: {e}")
+        return False
+    if not duplicates:
+        return False
+
+    st.session_state["duplicate_ack"] = fingerprint
+    lines = []
+    for d in duplicates:
+        if str(d["employee_email"]).lower() == user_email:
+            lines.append(f"- **{d['id']}**: {d['title']} ({d['status']}, raised by you)")
+        else:
+            # Other employees' tickets are only identified, not shown
+            lines.append(f"- **{d['id']}**: {d['category']} issue ({d['status']}, raised by a colleague)")
+    st.warning("This looks similar to open grievances that are already being handled:\n\n" + "\n".join(lines)
+               + "\n\nIf it is a different issue, press **Submit Grievance** again to raise it anyway.")
+    return True
+
+
+# -------------------------------
+# Export (streams the current filtered list to CSV / XLSX)
+# -------------------------------
+def export_grievances(ids: List[str], year: str, fmt: str):
+    """Writes the grievances in `ids` to a temporary CSV/XLSX file; returns (file, row count).
+
+    Entities are read from the table one page at a time and written as they
+    arrive, so neither the full dataset nor a formatted copy is held in memory.
+    Rows are written in table (id) order; ids only found in an archived year are
+    appended from that year's archive file.
+    """
+    wanted = set(ids)
+    def rows():
+        for row in export.iter_table_rows(get_table_client(GRIEVANCE_TABLE_NAME), wanted):
+            wanted.discard(row[0])
+            yield row
+        if wanted and _is_archived_year(year):
+            raw = archive.read_archive(archive.get_archive_container(get_blob_client()), int(year))
+            yield from export.iter_frame_rows(raw, wanted)
+    return export.export_rows(rows(), fmt)
+
+def export_controls(ids: List[str], key: str, inputs: tuple, year: str = "All"):
+    """Renders a two-step export: "Prepare export" writes the file, then a download button serves it.
+
+    A prepared file is dropped as soon as the filter/search `inputs` change.
+    """
+    state_key = f"{key}_export"
+    prepared = st.session_state.get(state_key)
+    if prepared and prepared["inputs"] != inputs:
+        prepared["file"].close()
+        st.session_state.pop(state_key)
+        prepared = None
+
+    col_fmt, col_prepare, col_download = st.columns([0.2, 0.4, 0.4])
+    fmt = col_fmt.selectbox("Format", list(export.FORMATS), key=f"{key}_export_format", label_visibility="collapsed")
+    if col_prepare.button(f"📤 Prepare export ({len(ids)} rows)", key=f"{key}_export_prepare", use_container_width=True):
+        if prepared:
+            prepared["file"].close()
+        with st.spinner("Preparing export..."):
+            try:
+                out, count = export_grievances(ids, year, fmt)
+            except Exception as e:
+                st.error(f"Error preparing export: {e}")
+                return
+        prepared = {"inputs": inputs, "file": out, "count": count, "fmt": fmt,
+                    "name": export.export_file_name(fmt)}
+        st.session_state[state_key] = prepared
+
+    if prepared:
+        def read_prepared():
+            prepared["file"].seek(0)
+            return prepared["file"].read()
+        # A callable is only read when the button is clicked, not on every rerun
+        col_download.download_button(f"⬇️ Download {prepared['fmt']} ({prepared['count']} rows)", data=read_prepared,
+                                     file_name=prepared["name"], mime=export.FORMATS[prepared["fmt"]][0],
+                                     key=f"{key}_export_download", use_container_width=True)
+
+
+# -------------------------------
+# SLA / Resolution Analytics (admin only, cached per snapshot version)
+# -------------------------------
+@st.cache_data(max_entries=2)
+def analytics_report(version: int) -> Dict[str, Any]:
+    """Builds the analytics report for a snapshot version (see analytics.build_report)."""
+    df = load_grievances_df()
+    long_comments = {e["RowKey"]: text_codec.decode_field(e, "comments")
+                     for e in fetch_all_grievances() if text_codec.is_encoded(e, "comments") and e["RowKey"] in df.index}
+    if long_comments: # The frame only holds a preview of compressed comments
+        df = df.copy()
+        df.loc[list(long_comments), "comments"] = list(long_comments.values())
+    return analytics.build_report(df)
+
+def _fmt_num(value: float, unit: str) -> str:
+    return "—" if pd.isna(value) else f"{value:,.1f} {unit}"
+
+def analytics_panel():
+    """Displays time-to-first-response, time-to-close, backlog age and assignee throughput."""
+    with st.expander("📈 SLA & Resolution Analytics (full history)"):
+        report = analytics_report(snapshot_version())
+        summary, backlog = report["summary"], report["backlog"]
+
+        m1, m2, m3, m4 = st.columns(4)
+        m1.metric("Median first response", _fmt_num(summary.loc["Time to first response", "p50_h"], "h"))
+        m2.metric("Median time to close", _fmt_num(summary.loc["Time to close", "p50_h"], "h"))
+        m3.metric("Backlog age p90", _fmt_num(backlog["p90_days"], "days"))
+        m4.metric("Tickets with a response", _fmt_num(report["responded_pct"], "%"))
+
+        st.markdown("**Response and resolution times (hours)**")
+        st.dataframe(summary.round(1), use_container_width=True)
+        st.markdown(
+            f'<p class="small-muted">Open backlog: {backlog["count"]} tickets · '
+            f'age p50 {_fmt_num(backlog["p50_days"], "days")} · p99 {_fmt_num(backlog["p99_days"], "days")} · '
+            f'oldest {_fmt_num(backlog["max_days"], "days")}</p>',
+            unsafe_allow_html=True,
+        )
+        st.markdown("**Throughput by assignee**")
+        st.dataframe(report["assignees"].round(1), use_container_width=True)
+        st.markdown("**Raised vs closed per month**")
+        st.bar_chart(report["monthly"])
+
+
 # ---------------------------------------------------
 # Dialog Content Function (from grievence_2, UPDATED)
 # ---------------------------------------------------
+def grievance_text(grievance_id: str, field: str, row_data: Dict[str, Any]) -> str:
+    """Full text of a description / comments field, decompressed only here, when shown.
+
+    The frame row holds a preview for text stored compressed (see text_codec.py);
+    archived rows already hold plain text.
+    """
+    entity = _grievance_store().get(grievance_id)
+    if entity is None or not text_codec.is_encoded(entity, field):
+        return str(row_data.get(field, ""))
+    try:
+        return text_codec.decode_field(entity, field)
+    except Exception as e:
+        print(f"⚠️ Failed to decode {field} of {grievance_id}: {e}")
+        return str(row_data.get(field, ""))
+
 @st.dialog("Grievance Details")
-def grievance_dialog_content(grievance_id: str, all_admins: List[Dict[str, Any]] = None):
-    """Displays and handles updates for a specific grievance in a dialog."""
+def grievance_dialog_content(grievance_id: str, year: str = "All"):
+    """Displays and handles updates for a specific grievance in a dialog.
+
+    `year` is the admin year filter the ticket was opened from; tickets found only in
+    that year's archive are shown read-only.
+    """
     # MODIFIED: Load DataFrame from new function
     df = load_grievances_df()
+    is_archived = False
     
     try:
-        row_data = df[df["id"] == grievance_id].iloc[0].to_dict()
-    except IndexError:
-        st.error("Could not find grievance. It may have been deleted.")
-        st.button("Close")
-        st.stop()
+        row_data = df.loc[grievance_id].to_dict()
+    except KeyError:
+        archived_df = load_archived_year_df(int(year)) if _is_archived_year(year) else empty_frame()
+        if grievance_id not in archived_df.index:
+            st.error("Could not find grievance. It may have been deleted.")
+            st.button("Close")
+            st.stop()
+        row_data = archived_df.loc[grievance_id].to_dict()
+        is_archived = True
         
     current_user_name = st.session_state.user["name"]
     current_user_email = st.session_state.user["email"]
@@ -426,13 +1158,15 @@ def grievance_dialog_content(grievance_id: str, all_admins: List[Dict[str, Any]]
     is_creator = (row_data["employee_email"].lower() == current_user_email.lower())
     
     # An employee (creator) can comment if the ticket isn't closed
-    can_employee_comment = is_creator and row_data["status"] != "Closed"
-    is_editable = is_admin or can_employee_comment
+    can_employee_comment = is_creator and row_data["status"] != "Closed" and not is_archived
+    is_editable = (is_admin or can_employee_comment) and not is_archived
 
     st.subheader(f"Grievance #{row_data['id']}: {row_data['title']}")
+    if is_archived:
+        st.caption("🗄️ Archived ticket (read-only).")
     
     with st.form(key=f"dialog_form_{grievance_id}", clear_on_submit=False):
-        st.markdown(f"**Description**: {row_data['description']}")
+        st.markdown(f"**Description**: {grievance_text(grievance_id, 'description', row_data)}")
         st.write("")
 
         col1, col2 = st.columns(2)
@@ -440,10 +1174,8 @@ def grievance_dialog_content(grievance_id: str, all_admins: List[Dict[str, Any]]
             st.markdown(f"**Category**: {row_data['category']}")
             st.markdown(f"**Employee**: {row_data['employee_name']} ({row_data['employee_email']})")
         with col2:
-            created_at_str = str(row_data.get('created_at', ''))
-            updated_at_str = str(row_data.get('updated_at', ''))
-            created_at = created_at_str.split(' ')[0]
-            updated_at = updated_at_str.split(' ')[0]
+            created_at = row_data["created_at"].strftime("%Y-%m-%d") if pd.notna(row_data["created_at"]) else ""
+            updated_at = row_data["updated_at"].strftime("%Y-%m-%d") if pd.notna(row_data["updated_at"]) else ""
             st.markdown(f"**Created At**: {created_at}")
             st.markdown(f"**Last Updated**: {updated_at}")
         st.write("")
@@ -464,16 +1196,15 @@ def grievance_dialog_content(grievance_id: str, all_admins: List[Dict[str, Any]]
             # Use columns for a cleaner look
             cols = st.columns(3) 
             
-            for i, base_url in enumerate(attachment_urls):
+            sas_urls = generate_sas_urls(attachment_urls)
+            for i, (base_url, sas_url) in enumerate(zip(attachment_urls, sas_urls)):
                 blob_name_full = base_url.split('/')[-1]
                 
                 # MODIFICATION: Skip the GRV_XXX_ prefix for display
-                # Finds the second part after the first two underscores (e.g., GRV_001_filename.ext -> filename.ext)
+                # Finds the second part after the first two underscores (e.g., GRV_001_filename.ext or
+                # GRV_001-1a2b3c4d_filename.ext -> filename.ext)
                 display_name = blob_name_full.split('_', 2)[-1] 
                 
-                # Generate a secure, temporary SAS URL
-                sas_url = generate_sas_url(base_url)
-                
                 with cols[i % 3]: # Cycle through 3 columns
                     st.markdown(
                         f"""
@@ -495,25 +1226,13 @@ def grievance_dialog_content(grievance_id: str, all_admins: List[Dict[str, Any]]
             
             # ADMIN ONLY FIELDS
             if is_admin:
-                # --- CACHE FIX (Part 1) ---
-                # If admin list wasn't passed (e.g., admin viewing from employee page),
-                # fetch it. Otherwise, use the pre-loaded list.
-                if all_admins is None:
-                    all_admins = fetch_all_admins()
-                
-                # Get name, fallback to email if name is missing
-                admin_names_set = set(
-                    [admin.get('name', admin.get('email')) for admin in all_admins if admin.get('name') or admin.get('email')]
-                )
-                
-                # --- SELF-ASSIGN FIX ---
-                # Ensure the current logged-in admin can self-assign
-                current_admin_name = st.session_state.user.get("name")
-                if current_admin_name:
-                    admin_names_set.add(current_admin_name)
-                # --- END SELF-ASSIGN FIX ---
-                    
-                admin_names = sorted(list(admin_names_set)) # Now create the sorted list
+                # Sorted admin names (name, else email) precomputed by the admin directory;
+                # the logged-in admin is always included so they can self-assign
+                try:
+                    admin_names = get_admin_directory().assignee_names(include=st.session_state.user.get("name"))
+                except Exception as e:
+                    st.error(f"Error fetching admin list: {e}")
+                    admin_names = [n for n in [st.session_state.user.get("name")] if n]
 
                 # Assigned To
                 current_assigned = str(row_data.get("assigned_to", "")).strip()
@@ -593,7 +1312,7 @@ def grievance_dialog_content(grievance_id: str, all_admins: List[Dict[str, Any]]
 
             # Add Comment logic (applies to admin and commenting employee)
             if new_comment.strip():
-                existing_comments = str(row_data.get("comments", "")).strip()
+                existing_comments = grievance_text(grievance_id, "comments", row_data).strip()
                 comment_line = f"[{datetime.now().strftime('%Y-%m-%d %H:%M')}] {current_user_name}: {new_comment.strip()}"
                 
                 if existing_comments:
@@ -612,7 +1331,7 @@ def grievance_dialog_content(grievance_id: str, all_admins: List[Dict[str, Any]]
         st.markdown("---")
         st.markdown("<h5>Comment History</h5>", unsafe_allow_html=True)
         
-        comments_content = str(row_data.get("comments", "")).strip()
+        comments_content = grievance_text(grievance_id, "comments", row_data).strip()
 
         if comments_content:
             st.markdown('<div class="comment-history-box">', unsafe_allow_html=True)
@@ -633,11 +1352,12 @@ def admin_view():
     user = st.session_state.user
     logout_btn() # Placed at the top right
 
-    # --- CACHE FIX (Part 2) ---
-    # Pre-load all admins ONCE when admin dashboard loads.
-    # This primes the @st.cache_data function.
-    all_admins = fetch_all_admins()
-    # --- END CACHE FIX ---
+    # Cold process: admins, grievances and KPI reads are issued concurrently first
+    prefetch_dashboard("admin")
+
+    # Load the shared admin directory up front (the dialog reads its assignee list)
+    fetch_all_admins()
+    user = apply_roster_name(user) # After the prefetch, so a cold start seeds the roster concurrently
 
     # Header
     col_title, col_user_info = st.columns([0.7, 0.3])
@@ -647,22 +1367,22 @@ def admin_view():
     with col_user_info:
         st.markdown(f'<p class="small-muted" style="text-align:right;">Logged in as <b>{user["name"]}</b> ({user["role"]})</p>', unsafe_allow_html=True)
 
-    # MODIFIED: Load DataFrame from new function
-    df = load_grievances_df()
-
     # Year-wise filtering (Kept from grievence_2)
-    if not df.empty and "created_at" in df.columns:
-        df["created_at"] = pd.to_datetime(df["created_at"], errors='coerce')
-        df = df.dropna(subset=["created_at"]) # Drop rows where date conversion failed
-        years = sorted(list(df["created_at"].dt.year.unique()), reverse=True)
-        year_filter = st.selectbox("📅 Filter by Year", ["All"] + [str(y) for y in years], index=0)
-        if year_filter != "All":
-            df = df[df["created_at"].dt.year == int(year_filter)]
+    # "All" lists the live table; selecting an archived year also loads that year's archive.
+    year_filter = "All"
+    years = grievance_years()
+    if years:
+        year_filter = st.selectbox("📅 Filter by Year", ["All"] + [str(y) for y in years], index=0,
+                                   help="Closed tickets from archived years are listed when their year is selected.")
 
     # Stats
     st.markdown('<div class="section-box">', unsafe_allow_html=True)
     st.subheader("Dashboard Stats")
-    stats_kpis(df)
+    live_updates("admin", None, year_filter)
+    header_counts = dashboard_counts("admin", year=year_filter)
+    stats_kpis(header_counts)
+    archive_note(header_counts, "admin", year=year_filter)
+    analytics_panel()
     st.markdown('</div>', unsafe_allow_html=True)
 
     st.markdown('<div class="section-box">', unsafe_allow_html=True)
@@ -686,30 +1406,18 @@ def admin_view():
     
     # Search (Kept from grievence_2)
     q = st.text_input("Search by title, description, employee, category", "", key="admin_search_query", placeholder="Search tickets...")
-    filtered = df.copy()
-    if status_filter != "All":
-        filtered = filtered[filtered["status"] == status_filter]
-    if q:
-        ql = q.lower()
-        filtered = filtered[
-            filtered.apply(
-                lambda r: any(
-                    ql in str(r[c]).lower()
-                    for c in ["id", "title", "description", "employee_name", "employee_email", "category", "assigned_to", "status"]
-                ),
-                axis=1,
-            )
-        ]
+    # Sorted (latest first) ids come straight from the result cache on unchanged reruns
+    matching_ids = query_grievance_ids("admin", None, year_filter, status_filter, q)
 
     # Grievance List Display (Kept from grievence_2)
-    if filtered.empty:
+    if not matching_ids:
         st.info("No grievances match the filter.")
     else:
-        filtered_for_display = filtered.copy()
-        filtered_for_display["Status"] = filtered_for_display["status"].apply(status_badge)
-        
-        # Sort by created_at descending (latest first)
-        sorted_df = filtered_for_display.sort_values("created_at", ascending=False)
+        export_controls(matching_ids, "admin_list", (year_filter, status_filter, q), year_filter)
+
+        # Only the current page is rendered, so build cost is O(page) not O(matches)
+        page_ids = paginate(matching_ids, "admin_list", (year_filter, status_filter, q))
+        sorted_df = rows_for_ids(grievance_view_frame("admin", None, year_filter), page_ids)
         
         # Render header row
         header_cols = st.columns([0.1, 0.25, 0.15, 0.15, 0.15, 0.1, 0.1])
@@ -730,15 +1438,12 @@ def admin_view():
             row_cols[2].write(row["category"])
             row_cols[3].write(row["employee_name"])
             row_cols[4].write(row["assigned_to"] or "Unassigned")
-            row_cols[5].markdown(row["Status"], unsafe_allow_html=True)
+            row_cols[5].markdown(status_badge(row["status"]), unsafe_allow_html=True)
             
             # "View" button using st.dialog
             with row_cols[6]:
-                # --- CACHE FIX (Part 3) ---
-                # Pass the pre-loaded 'all_admins' list into the dialog
                 st.button("👁️ View", key=f"view_admin_{row['id']}", help="View Details", type="secondary",
-                          on_click=lambda id=row['id'], admins=all_admins: grievance_dialog_content(id, admins))
-                # --- END CACHE FIX ---
+                          on_click=lambda id=row['id']: open_grievance_dialog(id, year_filter))
             st.markdown("---")
 
     st.markdown('</div>', unsafe_allow_html=True)
@@ -761,13 +1466,17 @@ def employee_view():
         st.markdown(f'<p class="small-muted" style="text-align:right;">Logged in as <b>{user["name"]}</b> ({user["role"]})</p>', unsafe_allow_html=True)
 
     # MODIFIED: Load DataFrame from new function
+    user_email = user["email"].lower()
+    prefetch_dashboard("employee", user_email) # Cold process: concurrent first load
     df = load_grievances_df()
-    mine = df[df["employee_email"].str.lower() == user["email"].lower()]
 
     # Stats (for this employee only)
     st.markdown('<div class="section-box">', unsafe_allow_html=True)
     st.subheader("Your Grievance Stats")
-    stats_kpis(mine)
+    live_updates("employee", user_email)
+    header_counts = dashboard_counts("employee", user_email)
+    stats_kpis(header_counts)
+    archive_note(header_counts, "employee", user_email)
     st.markdown('</div>', unsafe_allow_html=True)
 
     # Raise new grievance (Submission logic from grievence_3)
@@ -786,38 +1495,33 @@ def employee_view():
         submitted = st.form_submit_button("Submit Grievance", type="primary")
         st.markdown('</div>', unsafe_allow_html=True)
 
-    # --- SUBMISSION LOGIC (Updated for Blob Storage) ---
+    # --- SUBMISSION LOGIC (idempotent: see submit_grievance) ---
     if submitted:
+        # Same session + same form content = same key, so a second click or a retry resumes
+        if "submission_nonce" not in st.session_state:
+            st.session_state.submission_nonce = uuid.uuid4().hex
+        key = submissions.idempotency_key(st.session_state.submission_nonce, user_email, title, desc, category, files)
+        record = submission_record(key) if title.strip() else None
         if not title.strip():
             st.error("Please enter a title before submitting.")
+        elif submissions.stage_reached(record, "notified"):
+            st.info(f"This grievance was already submitted as {record['grievance_id']}; no duplicate was created.")
+        elif record is None and warn_if_duplicate(title, desc, user_email):
+            pass # Submitting the same text again goes ahead (a resumed submission matches itself)
         else:
-            with st.spinner("Submitting your grievance..."):
-                # Calculate ID *once*
-                all_rows = fetch_all_grievances()
-                new_id = generate_next_id(all_rows)
-                
-                attachments = []
-                if files:
-                    # Upload each file to Azure Blob Storage
-                    for f in files:
-                        # Create a unique blob name using the requested convention: GRV_XXX_filename.ext
-                        # We use the calculated new_id here (e.g., GRV_005)
-                        safe_name = "".join(c for c in f.name if c.isalnum() or c in ('.', '_', '-')).strip()
-                        blob_filename = f"{new_id}_{safe_name}" 
-                        
-                        # Upload and get the base URL
-                        blob_url = upload_file_to_blob(f, blob_filename)
-                        if blob_url:
-                            # Store the full base URL in the Table Storage
-                            attachments.append(blob_url)
-                        else:
-                            st.warning(f"Could not save attachment {f.name} to Azure.")
-                
-                # Pass all info to create_grievance
-                create_grievance(new_id, title, desc, category, user["name"], user["email"], attachments)
-            
-            st.success(f"✅ Grievance {new_id} submitted successfully! An email notification has been sent.")
-            st.rerun()
+            try:
+                with st.spinner("Submitting your grievance..."):
+                    new_id, complete = submit_grievance(key, title, desc, category, user, files)
+            except Exception as e:
+                print(f"⚠️ Submission {key} interrupted: {e}")
+                st.error("Submission was interrupted. Press Submit again to resume; nothing will be duplicated.")
+            else:
+                if complete:
+                    st.success(f"✅ Grievance {new_id} submitted successfully! An email notification has been sent.")
+                    st.rerun()
+                else:
+                    st.warning(f"Grievance {new_id} was created, but some admin notifications failed. "
+                               "Press Submit again to retry them.")
     st.markdown('</div>', unsafe_allow_html=True)
     # --- END SUBMISSION LOGIC ---
 
@@ -844,30 +1548,13 @@ def employee_view():
 
     # Search
     q = st.text_input("Search by title, description, category", key="emp_search_query", placeholder="Search your tickets...")
-    filtered = mine.copy()
-    if filter_status != "All":
-        filtered = filtered[filtered["status"]==filter_status]
-    if q:
-        ql = q.lower()
-        filtered = filtered[
-            filtered.apply(
-                lambda r: any(ql in str(r[c]).lower() for c in ["id", "title","description","category","status","assigned_to"]),
-                axis=1
-            )
-        ]
+    matching_ids = query_grievance_ids("employee", user_email, "All", filter_status, q)
         
-    if filtered.empty:
+    if not matching_ids:
         st.info("You haven't submitted any grievances yet or none match the filter.")
     else:
-        filtered_for_display = filtered.copy()
-        filtered_for_display["Status"] = filtered_for_display["status"].apply(status_badge)
-        
-        # Sort by created_at descending (latest first)
-        if "created_at" in filtered_for_display.columns:
-             filtered_for_display["created_at"] = pd.to_datetime(filtered_for_display["created_at"], errors='coerce')
-             sorted_df = filtered_for_display.sort_values("created_at", ascending=False)
-        else:
-             sorted_df = filtered_for_display # Fallback
+        page_ids = paginate(matching_ids, "emp_list", (filter_status, q))
+        sorted_df = rows_for_ids(df, page_ids)
         
         
         # Render header row
@@ -887,12 +1574,12 @@ def employee_view():
             row_cols[1].write(row["title"])
             row_cols[2].write(row["category"])
             row_cols[3].write(row["assigned_to"] or "Unassigned")
-            row_cols[4].markdown(row["Status"], unsafe_allow_html=True)
+            row_cols[4].markdown(status_badge(row["status"]), unsafe_allow_html=True)
             
             # "View" button for st.dialog
             with row_cols[5]:
                 st.button("👁️ View", key=f"view_employee_{row['id']}", help="View Details", type="secondary",
-                          on_click=lambda id=row['id']: grievance_dialog_content(id))
+                          on_click=lambda id=row['id']: open_grievance_dialog(id))
             st.markdown("---")
 
     st.markdown('</div>', unsafe_allow_html=True)
@@ -955,6 +1642,9 @@ def safe_load_dashboard():
 # Load dashboard with new auth flow
 user = safe_load_dashboard()
 
+# Counts full page runs (fragment reruns skip this), see live_updates
+st.session_state["full_runs"] = st.session_state.get("full_runs", 0) + 1
+
 # Once logged in, load respective dashboard (from grievence_2)
 role = user["role"]
 if role == "admin":
@@ -0,0 +1,676 @@
+import argparse
+import asyncio
+import base64
+import copy
+import itertools
+import json
+import os
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from azure.core.exceptions import ResourceExistsError, ResourceModifiedError, ResourceNotFoundError
+
+# --------------------------------------------------------------------------------
+# LOAD TEST (many simulated sessions against in-memory Azure Table / Blob / Graph)
+# --------------------------------------------------------------------------------
+# Each simulated user is a streamlit.testing AppTest session running grievence.py in
+# this process, so all sessions share the process-wide caches exactly as they would
+# on one app instance. Sessions act concurrently (one thread each): open the page,
+# filter, search, page through tickets, open the details dialog and, for employees,
+# submit grievances. Every action is one rerun; its wall time is recorded and each
+# session count gets p50/p95/p99 latency, throughput and resident memory.
+#
+#   python loadtest.py --sessions 1 5 10 25 --iterations 20 --grievances 5000
+APP_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "grievence.py")
+GRIEVANCES_WORKBOOK = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sample_grievances.xlsx")
+USERS_WORKBOOK = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sample_users.xlsx")
+DEFAULT_SESSIONS = [1, 5, 10, 25]
+DEFAULT_ITERATIONS = 20
+DEFAULT_ADMIN_SHARE = 0.2
+RUN_TIMEOUT = 120 # Seconds a single rerun may take before AppTest gives up
+SEARCH_TERMS = ["laptop", "salary", "ac", "printer", "leave", "network", "access", "slow", "broken", "payroll"]
+_WORDS = ["desk", "badge", "vpn", "invoice", "chair", "monitor", "parking", "canteen", "reimbursement",
+          "keyboard", "wifi", "shift", "roster", "locker", "projector", "license", "travel", "visa"]
+
+
+# --------------------------------------------------------------------------------
+# IN-MEMORY AZURE STAND-INS (the subset of the SDK surface the app uses)
+# --------------------------------------------------------------------------------
+_CONDITION_RE = re.compile(r"^\s*(\w+)\s+(eq|ne|lt|le|gt|ge)\s+(.+?)\s*$")
+_OPERATORS = {
+    "eq": lambda a, b: a == b, "ne": lambda a, b: a != b, "lt": lambda a, b: a < b,
+    "le": lambda a, b: a <= b, "gt": lambda a, b: a > b, "ge": lambda a, b: a >= b,
+}
+
+
+def _literal(token: str, parameters: Dict[str, Any]) -> Any:
+    if token.startswith("@"):
+        return parameters[token[1:]]
+    if token.startswith("'"):
+        return token[1:-1].replace("''", "'")
+    if token in ("true", "false"):
+        return token == "true"
+    return float(token) if "." in token else int(token)
+
+
+def _compile_filter(query_filter: Optional[str], parameters: Optional[Dict[str, Any]]) -> Callable[[Dict[str, Any]], bool]:
+    """OData subset: clauses joined by `and`, each a comparison or a parenthesised `or` of
+    comparisons, with literals or @parameters."""
+    clauses = []
+    for part in re.split(r"\s+and\s+", query_filter or ""):
+        if not part.strip():
+            continue
+        alternatives = []
+        for option in re.split(r"\s+or\s+", part.strip("() ")):
+            match = _CONDITION_RE.match(option.strip("() "))
+            if match is None:
+                raise ValueError(f"Unsupported filter clause: {part}")
+            field, op, token = match.groups()
+            alternatives.append((field, _OPERATORS[op], _literal(token, parameters or {})))
+        clauses.append(alternatives)
+
+    def holds(row: Dict[str, Any], field: str, op: Callable[[Any, Any], bool], value: Any) -> bool:
+        current = row.get(field)
+        try:
+            return current is not None and op(current, value)
+        except TypeError:
+            return False
+
+    def test(row: Dict[str, Any]) -> bool:
+        return all(any(holds(row, *condition) for condition in alternatives) for alternatives in clauses)
+    return test
+
+
+class MemoryEntity(dict):
+    """Table entity with the `metadata` (etag, timestamp) the SDK attaches."""
+
+    def __init__(self, row: Dict[str, Any], etag: str, timestamp: datetime):
+        super().__init__(row)
+        self["Timestamp"] = timestamp
+        self.metadata = {"etag": etag, "timestamp": timestamp}
+
+
+class _Pages(list):
+    def __init__(self, items: List[Any], page_size: int):
+        super().__init__(items)
+        self.page_size = page_size
+
+    def by_page(self, continuation_token=None) -> Iterator[Iterator[Any]]:
+        return (iter(self[i:i + self.page_size]) for i in range(0, len(self), self.page_size))
+
+
+class MemoryTable:
+    """Thread-safe stand-in for azure.data.tables.TableClient with optional per-call latency."""
+
+    def __init__(self, name: str, latency: float = 0.0):
+        self.table_name = name
+        self.latency = latency
+        self.calls = 0
+        self._rows: Dict[Tuple[str, str], Tuple[Dict[str, Any], str, datetime]] = {}
+        self._etag = itertools.count(1)
+        self._lock = threading.RLock()
+        self._local = threading.local() # Marks the thread running a transaction (one round trip)
+
+    def _io(self):
+        if getattr(self._local, "in_transaction", False):
+            return
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _store(self, entity: Dict[str, Any], merge_into: Optional[Dict[str, Any]] = None):
+        row = dict(merge_into or {})
+        row.update({k: v for k, v in entity.items() if k != "Timestamp"})
+        self._rows[(row["PartitionKey"], row["RowKey"])] = (row, str(next(self._etag)), datetime.now(timezone.utc))
+
+    def _entity(self, key: Tuple[str, str], select: Optional[List[str]] = None) -> MemoryEntity:
+        row, etag, timestamp = self._rows[key]
+        if select:
+            row = {k: row[k] for k in select if k in row}
+        return MemoryEntity(copy.deepcopy(row), etag, timestamp)
+
+    def create_table(self, **kw):
+        self._io()
+
+    def query_entities(self, query_filter: str = None, parameters: Dict[str, Any] = None, select: List[str] = None,
+                       results_per_page: int = None, **kw) -> _Pages:
+        self._io()
+        test = _compile_filter(query_filter, parameters)
+        with self._lock:
+            keys = sorted(k for k, (row, _, timestamp) in self._rows.items() if test(dict(row, Timestamp=timestamp)))
+            return _Pages([self._entity(k, select) for k in keys], results_per_page or 1000)
+
+    def list_entities(self, **kw) -> _Pages:
+        return self.query_entities(**kw)
+
+    def get_entity(self, partition_key: str, row_key: str, **kw) -> MemoryEntity:
+        self._io()
+        with self._lock:
+            if (partition_key, row_key) not in self._rows:
+                raise ResourceNotFoundError("The specified resource does not exist.")
+            return self._entity((partition_key, row_key))
+
+    def create_entity(self, entity: Dict[str, Any], **kw):
+        self._io()
+        with self._lock:
+            if (entity["PartitionKey"], entity["RowKey"]) in self._rows:
+                raise ResourceExistsError("The specified entity already exists.")
+            self._store(entity)
+
+    def update_entity(self, entity: Dict[str, Any], mode=None, etag: str = None, match_condition=None, **kw):
+        self._io()
+        with self._lock:
+            key = (entity["PartitionKey"], entity["RowKey"])
+            if key not in self._rows:
+                raise ResourceNotFoundError("The specified resource does not exist.")
+            if etag and self._rows[key][1] != etag:
+                raise ResourceModifiedError("The update condition specified in the request was not satisfied.")
+            self._store(entity, self._rows[key][0] if str(mode).lower().endswith("merge") else None)
+
+    def upsert_entity(self, entity: Dict[str, Any], mode=None, **kw):
+        self._io()
+        with self._lock:
+            current = self._rows.get((entity["PartitionKey"], entity["RowKey"]))
+            self._store(entity, current[0] if current and str(mode).lower().endswith("merge") else None)
+
+    def delete_entity(self, partition_key: str = None, row_key: str = None, etag: str = None, match_condition=None, **kw):
+        self._io()
+        with self._lock:
+            current = self._rows.get((partition_key, row_key))
+            if etag and current is not None and current[1] != etag:
+                raise ResourceModifiedError("The update condition specified in the request was not satisfied.")
+            self._rows.pop((partition_key, row_key), None)
+
+    def submit_transaction(self, operations: List[Tuple], **kw):
+        """Applies every operation or none, like an entity group transaction."""
+        self._io()
+        with self._lock:
+            saved = dict(self._rows)
+            self._local.in_transaction = True
+            try:
+                for operation in operations:
+                    kind, entity = operation[0], operation[1]
+                    if kind == "delete":
+                        self.delete_entity(entity["PartitionKey"], entity["RowKey"], **(operation[2] if len(operation) > 2 else {}))
+                    elif kind == "create":
+                        self.create_entity(entity)
+                    elif kind == "update":
+                        self.update_entity(entity, **(operation[2] if len(operation) > 2 else {}))
+                    else:
+                        self.upsert_entity(entity, **(operation[2] if len(operation) > 2 else {}))
+            except Exception:
+                self._rows = saved
+                raise
+            finally:
+                self._local.in_transaction = False
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+
+class _Download:
+    def __init__(self, data: bytes, etag: str):
+        self.data = data
+        self.properties = type("BlobProperties", (), {"etag": etag})()
+
+    def readall(self) -> bytes:
+        return self.data
+
+
+class _BlobItem:
+    def __init__(self, name: str):
+        self.name = name
+
+
+class MemoryBlob:
+    def __init__(self, container: "MemoryContainer", name: str):
+        self.container = container
+        self.blob_name = name
+        self.url = f"https://loadtest.blob.core.windows.net/{container.container_name}/{name}"
+
+    def upload_blob(self, data: Any, overwrite: bool = False, etag: str = None, match_condition=None, **kw):
+        self.container.service._io()
+        data = data.read() if hasattr(data, "read") else data
+        with self.container.lock:
+            current = self.container.blobs.get(self.blob_name)
+            if current is not None and not overwrite:
+                raise ResourceExistsError("The specified blob already exists.")
+            if etag and (current is None or current[1] != etag):
+                raise ResourceModifiedError("The condition specified using HTTP conditional header(s) is not met.")
+            self.container.blobs[self.blob_name] = (bytes(data), str(next(self.container.service.etags)))
+
+    def download_blob(self, **kw) -> _Download:
+        self.container.service._io()
+        with self.container.lock:
+            if self.blob_name not in self.container.blobs:
+                raise ResourceNotFoundError("The specified blob does not exist.")
+            return _Download(*self.container.blobs[self.blob_name])
+
+
+class MemoryContainer:
+    def __init__(self, service: "MemoryBlobService", name: str):
+        self.service = service
+        self.container_name = name
+        self.blobs: Dict[str, Tuple[bytes, str]] = {}
+        self.lock = threading.Lock()
+
+    def create_container(self, **kw):
+        raise ResourceExistsError("The specified container already exists.")
+
+    def get_blob_client(self, name: str) -> MemoryBlob:
+        return MemoryBlob(self, name)
+
+    def delete_blob(self, name: str, **kw):
+        self.service._io()
+        with self.lock:
+            self.blobs.pop(name, None)
+
+    def list_blobs(self, name_starts_with: str = "", **kw) -> List[_BlobItem]:
+        self.service._io()
+        with self.lock:
+            return [_BlobItem(n) for n in self.blobs if n.startswith(name_starts_with or "")]
+
+
+class MemoryBlobService:
+    """Stand-in for BlobServiceClient; SAS URLs are signed locally with a dummy key."""
+    account_name = "loadtest"
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls = 0
+        self.etags = itertools.count(1)
+        self.credential = type("Credential", (), {"account_name": "loadtest",
+                                                  "account_key": base64.b64encode(b"loadtest").decode()})()
+        self._containers: Dict[str, MemoryContainer] = {}
+        self._lock = threading.Lock()
+
+    def _io(self):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def get_container_client(self, name: str) -> MemoryContainer:
+        with self._lock:
+            return self._containers.setdefault(name, MemoryContainer(self, name))
+
+
+class MemoryAzure:
+    """The tables, blob service and Graph mailbox one load test runs against."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.tables: Dict[str, MemoryTable] = {}
+        self.blobs = MemoryBlobService(latency)
+        self.emails_sent = 0
+        self._lock = threading.Lock()
+
+    def get_table_client(self, name: str) -> MemoryTable:
+        with self._lock:
+            return self.tables.setdefault(name, MemoryTable(name, self.latency))
+
+    def get_blob_client(self) -> MemoryBlobService:
+        return self.blobs
+
+    def send_email(self, sender_user_id: str, to_emails: List[str], subject: str, html_body: str):
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.emails_sent += len(to_emails)
+        return "sent"
+
+    # Async clients for async_loader.py (same data, awaited latency)
+    def async_clients(self) -> Tuple[type, type]:
+        azure = self
+
+        class _AsyncPages:
+            def __init__(self, items: List[Any]):
+                self.items = items
+
+            def __aiter__(self):
+                return self._iterate()
+
+            async def _iterate(self):
+                if azure.latency:
+                    await asyncio.sleep(azure.latency)
+                for item in self.items:
+                    yield item
+
+        class _AsyncTable:
+            def __init__(self, name: str):
+                self.table = azure.get_table_client(name)
+
+            def query_entities(self, query_filter: str, **kw) -> _AsyncPages:
+                latency, self.table.latency = self.table.latency, 0.0 # Awaited instead, see _AsyncPages
+                try:
+                    return _AsyncPages(list(self.table.query_entities(query_filter, **kw)))
+                finally:
+                    self.table.latency = latency
+
+            async def get_entity(self, partition_key: str, row_key: str, **kw) -> MemoryEntity:
+                if azure.latency:
+                    await asyncio.sleep(azure.latency)
+                with self.table._lock:
+                    if (partition_key, row_key) not in self.table._rows:
+                        raise ResourceNotFoundError("The specified resource does not exist.")
+                    return self.table._entity((partition_key, row_key))
+
+        class _AsyncContainer:
+            def __init__(self, name: str):
+                self.container = azure.blobs.get_container_client(name)
+
+            def list_blobs(self, name_starts_with: str = "", **kw) -> _AsyncPages:
+                return _AsyncPages([_BlobItem(n) for n in list(self.container.blobs) if n.startswith(name_starts_with)])
+
+        class AsyncTableService:
+            @classmethod
+            def from_connection_string(cls, *args, **kw) -> "AsyncTableService":
+                return cls()
+
+            async def __aenter__(self):
+                return self
+
+            async def __aexit__(self, *exc):
+                return False
+
+            def get_table_client(self, name: str) -> _AsyncTable:
+                return _AsyncTable(name)
+
+        class AsyncBlobService(AsyncTableService):
+            def get_container_client(self, name: str) -> _AsyncContainer:
+                return _AsyncContainer(name)
+
+        return AsyncTableService, AsyncBlobService
+
+    def install(self):
+        """Points the app's client factories and the Graph sender at this stand-in."""
+        import async_loader
+        import azure_clients
+        import email_sender
+        azure_clients.get_table_client = self.get_table_client
+        azure_clients.get_blob_client = self.get_blob_client
+        email_sender.send_email = self.send_email
+        async_loader.TableServiceClient, async_loader.BlobServiceClient = self.async_clients()
+
+
+# --------------------------------------------------------------------------------
+# TEST DATA
+# --------------------------------------------------------------------------------
+def seed(azure: MemoryAzure, grievances: int = 0, workbook: str = GRIEVANCES_WORKBOOK,
+         users_workbook: str = USERS_WORKBOOK, rng: Optional[random.Random] = None) -> Dict[str, List[Dict[str, str]]]:
+    """Loads the sample workbooks (scaled up to `grievances` rows if larger) and builds the aggregates.
+
+    Returns the users to simulate, by role.
+    """
+    import aggregates_store
+    import bulk_import
+    from azure_clients import GRIEVANCE_TABLE_NAME, ADMINS_TABLE_NAME, AGGREGATES_TABLE_NAME
+
+    rng = rng or random.Random(0)
+    users = [row for _, row in bulk_import.iter_rows(users_workbook)]
+    by_role = {"admin": [], "employee": []}
+    for user in users:
+        role = str(user.get("role") or "employee").lower()
+        by_role[role].append({"name": str(user["name"]), "email": str(user["email"]).lower(), "role": role})
+        admin = bulk_import.admin_entity(user)
+        if admin is not None:
+            azure.get_table_client(ADMINS_TABLE_NAME).create_entity(entity=admin)
+
+    samples = [bulk_import.grievance_entity(row) for _, row in bulk_import.iter_rows(workbook)]
+    table = azure.get_table_client(GRIEVANCE_TABLE_NAME)
+    total = max(grievances, len(samples))
+    now = datetime.now()
+    for number in range(1, total + 1):
+        entity = dict(samples[(number - 1) % len(samples)])
+        if number > len(samples): # Synthetic copy: new id, owner, age and some new words
+            owner = rng.choice(by_role["employee"] or users)
+            created = (now - timedelta(days=rng.randint(0, 3 * 365))).strftime("%Y-%m-%d %H:%M:%S")
+            entity.update({
+                "title": f"{entity['title']} {rng.choice(_WORDS)}",
+                "description": f"{entity['description']} {' '.join(rng.sample(_WORDS, 4))}",
+                "employee_name": owner["name"], "employee_email": owner["email"],
+                "status": rng.choice(["Open", "WIP", "Closed", "Closed"]),
+                "created_at": created, "updated_at": created,
+            })
+        entity["RowKey"] = f"GRV_{number:03d}"
+        table.create_entity(entity=entity)
+    aggregates_store.rebuild(table, azure.get_table_client(AGGREGATES_TABLE_NAME))
+    return by_role
+
+
+# --------------------------------------------------------------------------------
+# SIMULATED SESSIONS
+# --------------------------------------------------------------------------------
+def _widget(widgets, key: str = None, label: str = None, prefix: str = None):
+    for widget in widgets:
+        if (key and widget.key == key) or (label and getattr(widget, "label", None) == label) \
+                or (prefix and (widget.key or "").startswith(prefix)):
+            return widget
+    return None
+
+
+def share_app_runtime():
+    """Lets AppTest sessions run at the same time, the way a server's sessions do.
+
+    AppTest installs a mock Runtime singleton for the length of each run and removes
+    it afterwards, which breaks any other session still running: keep the most recent
+    one reachable instead. The "appTest" config flag it patches in per run is set for
+    the whole process, as overlapping patches would restore it mid-run. It also compiles
+    the script on every run; a server compiles it once and shares the bytecode (and
+    concurrent compiles can fail on CPython 3.11).
+    """
+    from streamlit import config
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1.util import build_mock_config_get_option
+    original_instance = Runtime.instance.__func__
+    original_bytecode = ScriptCache.get_bytecode
+    latest: Dict[str, Any] = {}
+    bytecode: Dict[str, Any] = {}
+    compile_lock = threading.Lock()
+
+    def instance(cls):
+        if cls._instance is not None:
+            latest["runtime"] = cls._instance
+            return cls._instance
+        return latest["runtime"] if latest else original_instance(cls)
+
+    def get_bytecode(self, script_path: str):
+        with compile_lock:
+            if script_path not in bytecode:
+                bytecode[script_path] = original_bytecode(self, script_path)
+            return bytecode[script_path]
+    Runtime.instance = classmethod(instance)
+    ScriptCache.get_bytecode = get_bytecode
+    config.get_option = build_mock_config_get_option({"global.appTest": True})
+
+
+class SimSession:
+    """One simulated user: an AppTest session plus the actions its role can take."""
+
+    def __init__(self, user: Dict[str, str], rng: random.Random, timeout: float = RUN_TIMEOUT):
+        from streamlit.testing.v1 import AppTest
+        self.user = user
+        self.rng = rng
+        self.at = AppTest.from_file(APP_SCRIPT, default_timeout=timeout)
+        self.at.session_state["user"] = dict(user)
+        self.submitted = 0
+        is_admin = user["role"] == "admin"
+        self.actions: List[Tuple[str, Callable[[], bool]]] = [
+            ("rerun", lambda: True),
+            ("filter", lambda: self._click("tab_" if is_admin else "emp_tab_")),
+            ("search", lambda: self._search("admin_search_query" if is_admin else "emp_search_query")),
+            ("page", lambda: self._click("admin_list_next" if is_admin else "emp_list_next", exact=True)),
+            ("dialog", lambda: self._click("view_admin_" if is_admin else "view_employee_")),
+        ]
+        self.actions.append(("year", self._year) if is_admin else ("submit", self._submit))
+
+    def _click(self, prefix: str, exact: bool = False) -> bool:
+        buttons = [b for b in self.at.button if (b.key == prefix if exact else (b.key or "").startswith(prefix))
+                   and not b.disabled]
+        if not buttons:
+            return False
+        self.rng.choice(buttons).click()
+        return True
+
+    def _search(self, key: str) -> bool:
+        box = _widget(self.at.text_input, key=key)
+        if box is None:
+            return False
+        box.input("" if box.value else self.rng.choice(SEARCH_TERMS))
+        return True
+
+    def _year(self) -> bool:
+        select = _widget(self.at.selectbox, label="📅 Filter by Year")
+        if select is None:
+            return False
+        select.select(self.rng.choice(select.options))
+        return True
+
+    def _submit(self) -> bool:
+        title, desc = _widget(self.at.text_input, label="Title"), _widget(self.at.text_area, label="Description")
+        submit = _widget(self.at.button, key="FormSubmitter:raise_grievance-Submit Grievance")
+        if title is None or desc is None or submit is None:
+            return False
+        self.submitted += 1
+        words = " ".join(self.rng.sample(_WORDS, 3))
+        title.input(f"Load test {self.user['email'].split('@')[0]} {self.submitted} {words}")
+        desc.input(f"Simulated submission {self.rng.getrandbits(64):x}: {words}")
+        submit.click()
+        return True
+
+    def run(self, action: str) -> Tuple[float, int]:
+        """Reruns the script; returns (seconds, exceptions raised)."""
+        start = time.perf_counter()
+        try:
+            self.at.run()
+        except Exception as e: # Timeouts and AppTest failures count as errors, the session goes on
+            print(f"⚠️ {action} rerun failed for {self.user['email']}: {e}")
+            return time.perf_counter() - start, 1
+        return time.perf_counter() - start, len(self.at.exception)
+
+    def step(self) -> Tuple[str, float, int]:
+        """Takes a random action (falling back to a plain rerun) and times the rerun it causes."""
+        name, act = self.rng.choice(self.actions)
+        if not act():
+            name = "rerun"
+        return (name,) + self.run(name)
+
+
+def rss_mb() -> Optional[float]:
+    """Resident memory of this process in MB (peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import resource # Unix only
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if os.uname().sysname == "Darwin" else peak / 1024
+    except (ImportError, AttributeError):
+        return None
+
+
+def _percentiles(samples: List[float]) -> Dict[str, float]:
+    if not samples:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0}
+    p50, p95, p99 = np.percentile(np.array(samples) * 1000, [50, 95, 99])
+    return {"p50": float(p50), "p95": float(p95), "p99": float(p99)}
+
+
+def run_level(users: Dict[str, List[Dict[str, str]]], sessions: int, iterations: int,
+              admin_share: float = DEFAULT_ADMIN_SHARE, seed_value: int = 0, timeout: float = RUN_TIMEOUT) -> Dict[str, Any]:
+    """Runs `sessions` concurrent sessions for `iterations` actions each and summarises the reruns."""
+    rng = random.Random(seed_value)
+    admins = max(1, round(sessions * admin_share)) if users["admin"] and admin_share > 0 else 0
+    roster = [rng.choice(users["admin"]) for _ in range(admins)]
+    roster += [rng.choice(users["employee"]) for _ in range(sessions - admins)]
+    samples: List[Tuple[str, float, int]] = []
+    lock = threading.Lock()
+
+    def drive(index: int):
+        session = SimSession(roster[index], random.Random(seed_value * 1000 + index), timeout)
+        results = [("open",) + session.run("open")]
+        for _ in range(iterations):
+            results.append(session.step())
+        with lock:
+            samples.extend(results)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions, thread_name_prefix="loadtest-session") as pool:
+        for future in [pool.submit(drive, i) for i in range(sessions)]:
+            future.result()
+    elapsed = time.perf_counter() - start
+
+    by_action: Dict[str, List[float]] = {}
+    for action, seconds, _ in samples:
+        by_action.setdefault(action, []).append(seconds)
+    return {
+        "sessions": sessions, "admins": admins, "reruns": len(samples),
+        "errors": sum(errors for _, _, errors in samples), "seconds": elapsed,
+        "throughput": len(samples) / elapsed if elapsed else 0.0, "rss_mb": rss_mb(),
+        **_percentiles([seconds for _, seconds, _ in samples]),
+        "actions": {action: dict(count=len(times), **_percentiles(times)) for action, times in sorted(by_action.items())},
+    }
+
+
+def _print_report(results: List[Dict[str, Any]]):
+    print(f"{'sessions':>8} {'reruns':>7} {'errors':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'reruns/s':>9} {'RSS MB':>8}")
+    for r in results:
+        rss = f"{r['rss_mb']:.0f}" if r["rss_mb"] is not None else "n/a"
+        print(f"{r['sessions']:>8} {r['reruns']:>7} {r['errors']:>6} {r['p50']:>8.0f} {r['p95']:>8.0f} "
+              f"{r['p99']:>8.0f} {r['throughput']:>9.1f} {rss:>8}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Load-test the grievance app with concurrent simulated sessions.")
+    parser.add_argument("--sessions", type=int, nargs="+", default=DEFAULT_SESSIONS, help="Concurrent session counts to run.")
+    parser.add_argument("--iterations", type=int, default=DEFAULT_ITERATIONS, help="Actions per session after the first page load.")
+    parser.add_argument("--grievances", type=int, default=0, help="Scale the sample data up to this many grievances.")
+    parser.add_argument("--admin-share", type=float, default=DEFAULT_ADMIN_SHARE, help="Fraction of sessions that are admins.")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Simulated Azure / Graph round trip per call.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=RUN_TIMEOUT, help="Seconds one rerun may take.")
+    parser.add_argument("--json", help="Also write the results (with per-action latencies) to this file.")
+    parser.add_argument("--max-p95", type=float, help="Exit with status 1 if any level's p95 exceeds this many ms.")
+    args = parser.parse_args(argv)
+
+    azure = MemoryAzure(latency=args.latency_ms / 1000)
+    azure.install()
+    share_app_runtime()
+    users = seed(azure, args.grievances, rng=random.Random(args.seed))
+    print(f"✅ Seeded {len(azure.get_table_client('Grievancesraised'))} grievances, "
+          f"{len(users['admin'])} admins, {len(users['employee'])} employees.")
+
+    results = []
+    for sessions in args.sessions:
+        results.append(run_level(users, sessions, args.iterations, args.admin_share, args.seed, args.timeout))
+        print(f"… {sessions} sessions: p95 {results[-1]['p95']:.0f} ms, {results[-1]['throughput']:.1f} reruns/s")
+    print()
+    _print_report(results)
+    print(f"Emails sent: {azure.emails_sent}; table calls: {sum(t.calls for t in azure.tables.values())}; "
+          f"blob calls: {azure.blobs.calls}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as out:
+            json.dump({"args": vars(args), "results": results}, out, indent=2)
+    if args.max_p95 is not None and any(r["p95"] > args.max_p95 for r in results):
+        print(f"⚠️ p95 rerun latency above {args.max_p95:.0f} ms.")
+        return 1
+    if any(r["errors"] for r in results):
+        print("⚠️ Some reruns raised exceptions.")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
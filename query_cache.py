@@ -0,0 +1,57 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+
+# --------------------------------------------------------------------------------
+# LRU RESULT CACHE (query results keyed by snapshot version + view inputs)
+# --------------------------------------------------------------------------------
+class LRUCache:
+    """Small thread-safe LRU mapping shared by all sessions of a process.
+
+    Keys should start with the snapshot version, so entries of older snapshots
+    are never served again and simply age out of the cache.
+    """
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def put(self, key: Hashable, value: Any):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """Returns the cached value for key, computing and storing it on a miss.
+
+        The computation runs outside the lock; two sessions missing the same key
+        at once may both compute it, which is harmless for pure query results.
+        """
+        sentinel = object()
+        value = self.get(key, sentinel)
+        if value is sentinel:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
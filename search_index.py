@@ -0,0 +1,120 @@
+import re
+import threading
+from bisect import bisect_left, insort
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+# --------------------------------------------------------------------------------
+# INVERTED INDEX (full-text search for the admin / employee search boxes)
+# --------------------------------------------------------------------------------
+_TOKEN_RE = re.compile(r"[^\W_]+")
+_VERIFY_LIMIT = 256  # below this many candidates, later terms are checked per document
+
+
+def tokenize(text: Any) -> List[str]:
+    """Lower-cases text and splits it into alphanumeric tokens ("GRV_001" -> grv, 001)."""
+    return _TOKEN_RE.findall(str(text or "").lower())
+
+
+class InvertedIndex:
+    """Token -> {doc_id: field bitmask} index with prefix matching and AND queries.
+
+    Built once per snapshot and updated incrementally with `upsert` / `remove`.
+    A sorted term list gives prefix lookups in O(log V + matches) via bisect.
+    """
+
+    def __init__(self, fields: List[str], id_field: str = "RowKey"):
+        self.fields = list(fields)
+        self.id_field = id_field
+        self._field_bits = {f: 1 << i for i, f in enumerate(self.fields)}
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._doc_terms: Dict[str, Dict[str, int]] = {}
+        self._terms: List[str] = []
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict[str, Any]], fields: List[str], id_field: str = "RowKey") -> "InvertedIndex":
+        index = cls(fields, id_field)
+        for record in records:
+            index.upsert(record, _bulk=True)
+        index._terms = sorted(index._postings)
+        return index
+
+    def __len__(self) -> int:
+        return len(self._doc_terms)
+
+    def _mask(self, fields: Optional[List[str]]) -> int:
+        if fields is None:
+            return (1 << len(self.fields)) - 1
+        return sum(self._field_bits[f] for f in fields if f in self._field_bits)
+
+    def upsert(self, record: Dict[str, Any], _bulk: bool = False):
+        """Adds or re-indexes one record (keyed by its id field)."""
+        doc_id = str(record.get(self.id_field, ""))
+        if not doc_id:
+            return
+        terms: Dict[str, int] = {}
+        for field in self.fields:
+            bit = self._field_bits[field]
+            for token in tokenize(record.get(field, "")):
+                terms[token] = terms.get(token, 0) | bit
+
+        with self._lock:
+            self._drop(doc_id)
+            for token, mask in terms.items():
+                posting = self._postings.get(token)
+                if posting is None:
+                    posting = self._postings[token] = {}
+                    if not _bulk:
+                        insort(self._terms, token)
+                posting[doc_id] = mask
+            self._doc_terms[doc_id] = terms
+
+    def remove(self, doc_id: str):
+        with self._lock:
+            self._drop(doc_id)
+
+    def _drop(self, doc_id: str):
+        for token in self._doc_terms.pop(doc_id, {}):
+            posting = self._postings.get(token)
+            if posting is None:
+                continue
+            posting.pop(doc_id, None)
+            if not posting:
+                del self._postings[token]
+                i = bisect_left(self._terms, token)
+                if i < len(self._terms) and self._terms[i] == token:
+                    del self._terms[i]
+
+    def _prefix_docs(self, prefix: str, mask: int) -> Set[str]:
+        docs: Set[str] = set()
+        i = bisect_left(self._terms, prefix)
+        while i < len(self._terms) and self._terms[i].startswith(prefix):
+            docs.update(d for d, m in self._postings[self._terms[i]].items() if m & mask)
+            i += 1
+        return docs
+
+    def _doc_has_prefix(self, doc_id: str, prefix: str, mask: int) -> bool:
+        return any(t.startswith(prefix) and m & mask for t, m in self._doc_terms.get(doc_id, {}).items())
+
+    def search(self, query: str, fields: Optional[List[str]] = None) -> Set[str]:
+        """Returns ids matching every query term (each term is a prefix match).
+
+        `fields` restricts matching to a subset of the indexed fields. An empty
+        query (no tokens) matches every document.
+        """
+        mask = self._mask(fields)
+        tokens = sorted(set(tokenize(query)), key=len, reverse=True)  # longest = most selective first
+        with self._lock:
+            if not tokens:
+                return set(self._doc_terms)
+            result: Optional[Set[str]] = None
+            for token in tokens:
+                if result is not None and len(result) <= _VERIFY_LIMIT:
+                    # Few candidates left: check their own terms instead of expanding the prefix
+                    result = {d for d in result if self._doc_has_prefix(d, token, mask)}
+                else:
+                    docs = self._prefix_docs(token, mask)
+                    result = docs if result is None else result & docs
+                if not result:
+                    return set()
+            return result
@@ -0,0 +1,194 @@
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Tuple
+
+from azure.data.tables import TableClient
+
+# --------------------------------------------------------------------------------
+# LIVE GRIEVANCE SNAPSHOT (one mutable copy per process, kept fresh by a poller)
+# --------------------------------------------------------------------------------
+# The store holds every live grievance entity by RowKey. A background poller asks
+# the table only for entities whose Timestamp moved since the last poll and merges
+# them in; each merge that changes something starts a new version and is kept in a
+# short change log, so sessions can tell whether their own view was affected.
+GRIEVANCE_FILTER = "PartitionKey eq 'GRIEVANCE'"
+CHANGES_FILTER = "PartitionKey eq 'GRIEVANCE' and Timestamp ge @since"
+# Re-read a little before the last seen Timestamp: entities committed in the same
+# instant as the previous poll are not missed (duplicates are filtered by content).
+POLL_OVERLAP = timedelta(seconds=2)
+CHANGE_LOG_SIZE = 256
+
+Change = Tuple[Optional[Dict[str, Any]], Dict[str, Any]] # (before, after)
+Listener = Callable[[int, int, List[Change]], None]
+
+
+def _timestamp(entity: Any) -> Optional[datetime]:
+    metadata = getattr(entity, "metadata", None) or {}
+    return metadata.get("timestamp") or entity.get("Timestamp")
+
+
+def _plain(entity: Any) -> Dict[str, Any]:
+    """Entity fields without server metadata, so re-reads of unchanged rows compare equal."""
+    out = dict(entity)
+    out.pop("Timestamp", None)
+    return out
+
+
+class SnapshotStore:
+    """Thread-safe, versioned in-memory copy of the grievance table."""
+
+    def __init__(self, table_factory: Callable[[], TableClient], log_size: int = CHANGE_LOG_SIZE):
+        self.table_factory = table_factory
+        self.version = 0
+        self.watermark: Optional[datetime] = None
+        self._entities: Dict[str, Dict[str, Any]] = {}
+        self._log: Deque[Tuple[int, List[Change]]] = deque(maxlen=log_size)
+        self._log_floor = 0 # Oldest version whose successors are all in the log
+        self._loaded = False
+        self._listeners: List[Listener] = []
+        self._derived: Dict[str, Tuple[int, Any]] = {}
+        self._lock = threading.RLock()
+        self._derived_lock = threading.Lock()
+
+    def subscribe(self, listener: Listener):
+        """Registers listener(previous_version, version, changes), called after each merge."""
+        self._listeners.append(listener)
+
+    def _advance_watermark(self, entities: Iterable[Any]):
+        stamps = [ts for ts in map(_timestamp, entities) if ts is not None]
+        if stamps and (self.watermark is None or max(stamps) > self.watermark):
+            self.watermark = max(stamps)
+
+    def ensure_loaded(self):
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self.reload()
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def seed(self, entities: List[Any]) -> bool:
+        """Loads entities read elsewhere (e.g. concurrently at start-up) if nothing is loaded yet."""
+        with self._lock:
+            if self._loaded:
+                return False
+            self._replace(entities)
+            return True
+
+    def reload(self):
+        """Replaces the snapshot with a full read of the table (a gap in the change log)."""
+        entities = list(self.table_factory().query_entities(GRIEVANCE_FILTER))
+        self._replace(entities)
+
+    def _replace(self, entities: List[Any]):
+        with self._lock:
+            self._entities = {e["RowKey"]: _plain(e) for e in entities}
+            self.watermark = None
+            self._advance_watermark(entities)
+            self.version += 1
+            self._log.clear()
+            self._log_floor = self.version
+            self._loaded = True
+
+    def _merge(self, entities: List[Any], advance: bool = False) -> List[Change]:
+        changes = []
+        with self._lock:
+            if advance:
+                self._advance_watermark(entities)
+            for entity in entities:
+                after = _plain(entity)
+                before = self._entities.get(after["RowKey"])
+                if before == after:
+                    continue
+                self._entities[after["RowKey"]] = after
+                changes.append((before, after))
+            if not changes:
+                return changes
+            previous = self.version
+            self.version += 1
+            current = self.version
+            self._log.append((current, changes))
+            if len(self._log) == self._log.maxlen:
+                self._log_floor = self._log[0][0] - 1
+        # Outside the lock: listeners may take their own locks and read the store
+        for listener in self._listeners:
+            listener(previous, current, changes)
+        return changes
+
+    def apply(self, entities: List[Dict[str, Any]]) -> List[Change]:
+        """Merges entities written by this process (no table read)."""
+        self.ensure_loaded()
+        return self._merge(entities)
+
+    def poll(self) -> List[Change]:
+        """Reads entities changed since the last poll and merges them in."""
+        self.ensure_loaded()
+        if self.watermark is None:
+            self.reload() # Nothing to anchor a Timestamp filter on
+            return []
+        entities = list(self.table_factory().query_entities(
+            CHANGES_FILTER, parameters={"since": self.watermark - POLL_OVERLAP}))
+        return self._merge(entities, advance=True)
+
+    def entities(self) -> List[Dict[str, Any]]:
+        self.ensure_loaded()
+        with self._lock:
+            return list(self._entities.values())
+
+    def get(self, row_key: str) -> Optional[Dict[str, Any]]:
+        self.ensure_loaded()
+        with self._lock:
+            return self._entities.get(row_key)
+
+    def changes_since(self, version: int, until: Optional[int] = None) -> Optional[List[Change]]:
+        """Changes after `version` (up to `until`), or None if they are no longer all in the log."""
+        with self._lock:
+            if version < self._log_floor:
+                return None
+            return [c for v, changes in self._log if v > version and (until is None or v <= until) for c in changes]
+
+    def derived(self, name: str, build: Callable[[], Any],
+                update: Optional[Callable[[Any, List[Change]], Any]] = None) -> Any:
+        """Returns a value computed from the snapshot, once per version.
+
+        With `update`, a value from an older version is brought forward from the
+        change log instead of being rebuilt.
+        """
+        self.ensure_loaded()
+        with self._derived_lock:
+            cached = self._derived.get(name)
+            with self._lock: # The version and its change slice must agree with each other
+                version = self.version
+                if cached is not None and cached[0] == version:
+                    return cached[1]
+                changes = self.changes_since(cached[0], version) if cached is not None and update else None
+            value = update(cached[1], changes) if changes is not None else build()
+            self._derived[name] = (version, value)
+            return value
+
+
+class ChangePoller:
+    """Daemon thread that calls `tick` every `interval` seconds (errors are logged, not raised)."""
+
+    def __init__(self, tick: Callable[[], None], interval: float):
+        self.tick = tick
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="grievance-change-poller", daemon=True)
+
+    def start(self) -> "ChangePoller":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.tick()
+            except Exception as e:
+                print(f"⚠️ Change poll failed: {e}")
@@ -0,0 +1,83 @@
+import hashlib
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from azure.core import MatchConditions
+from azure.core.exceptions import ResourceExistsError, ResourceNotFoundError
+from azure.data.tables import TableClient, UpdateMode
+
+from grievance_schema import DATETIME_FORMAT
+
+# --------------------------------------------------------------------------------
+# SUBMISSION OUTBOX (idempotency records for the "Submit Grievance" pipeline)
+# --------------------------------------------------------------------------------
+# One entity per form submission, keyed by its idempotency key. The pipeline moves it
+# through STAGES and records what it has done (reserved id, uploaded attachments,
+# admins notified), so a retried or resumed submission skips the finished steps.
+SUBMISSION_PARTITION = "SUBMISSION"
+STAGES = ["reserved", "uploaded", "created", "notified"]
+
+
+def idempotency_key(nonce: str, email: str, title: str, desc: str, category: str, files: Iterable[Any] = ()) -> str:
+    """Derives a submission key from a per-session nonce and the form content.
+
+    Re-submitting the same form in the same session (double click, rerun, retry after
+    an error) gives the same key; changed content gives a new one.
+    """
+    parts = [nonce, email.lower(), title.strip(), desc.strip(), category]
+    parts += [f"{getattr(f, 'name', '')}:{getattr(f, 'size', '')}" for f in files or []]
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()[:32]
+
+
+def split_list(value: Any) -> List[str]:
+    return [v for v in str(value or "").split(";") if v]
+
+
+def stage_reached(record: Optional[Dict[str, Any]], stage: str) -> bool:
+    return record is not None and STAGES.index(record.get("stage", STAGES[0])) >= STAGES.index(stage)
+
+
+def get_submission(table: TableClient, key: str) -> Optional[Dict[str, Any]]:
+    try:
+        return table.get_entity(partition_key=SUBMISSION_PARTITION, row_key=key)
+    except ResourceNotFoundError:
+        return None
+
+
+def reserve(table: TableClient, key: str, grievance_id: str, email: str) -> Dict[str, Any]:
+    """Records a new submission with its reserved grievance id; returns the stored record.
+
+    If a concurrent request with the same key got there first, its record wins.
+    """
+    record = {
+        "PartitionKey": SUBMISSION_PARTITION, "RowKey": key, "grievance_id": grievance_id,
+        "employee_email": email, "stage": STAGES[0], "attachments": "", "notified": "",
+        "created_at": datetime.now().strftime(DATETIME_FORMAT),
+    }
+    try:
+        table.create_entity(entity=record)
+    except ResourceExistsError:
+        pass
+    return get_submission(table, key)
+
+
+def advance(table: TableClient, record: Dict[str, Any], **fields) -> Dict[str, Any]:
+    """Saves progress on a submission (ETag-guarded, so a concurrent retry can't be overwritten)."""
+    for field, value in fields.items():
+        record[field] = ";".join(value) if isinstance(value, (list, set, tuple)) else value
+    metadata = getattr(record, "metadata", None) or {}
+    if metadata.get("etag"):
+        table.update_entity(entity=record, mode=UpdateMode.MERGE,
+                            etag=metadata["etag"], match_condition=MatchConditions.IfNotModified)
+    else:
+        table.upsert_entity(entity=record, mode=UpdateMode.MERGE)
+    return get_submission(table, record["RowKey"])
+
+
+def ensure_table(table: TableClient) -> TableClient:
+    """Creates the outbox table on first use."""
+    try:
+        table.create_table()
+    except ResourceExistsError:
+        pass
+    return table
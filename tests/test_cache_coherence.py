@@ -0,0 +1,81 @@
+import itertools
+
+import pytest
+from azure.core.exceptions import ResourceExistsError, ResourceModifiedError, ResourceNotFoundError
+
+from cache_coherence import CoherenceChecker, TableVersionBackend
+
+
+class FakeTable:
+    """Just enough of TableClient for the version entity; every call fails until the table exists."""
+
+    def __init__(self, exists: bool = False):
+        self.exists = exists
+        self.rows = {}
+        self.etags = itertools.count(1)
+
+    def _check(self):
+        if not self.exists:
+            raise ResourceNotFoundError("TableNotFound")
+
+    def create_table(self):
+        if self.exists:
+            raise ResourceExistsError("TableAlreadyExists")
+        self.exists = True
+
+    def get_entity(self, partition_key, row_key):
+        self._check()
+        if (partition_key, row_key) not in self.rows:
+            raise ResourceNotFoundError("ResourceNotFound")
+        entity, etag = self.rows[(partition_key, row_key)]
+        out = type("Entity", (dict,), {})(entity)
+        out.metadata = {"etag": etag}
+        return out
+
+    def create_entity(self, entity):
+        self._check()
+        key = (entity["PartitionKey"], entity["RowKey"])
+        if key in self.rows:
+            raise ResourceExistsError("EntityAlreadyExists")
+        self.rows[key] = (dict(entity), next(self.etags))
+
+    def update_entity(self, entity, mode=None, etag=None, match_condition=None):
+        self._check()
+        key = (entity["PartitionKey"], entity["RowKey"])
+        if self.rows[key][1] != etag:
+            raise ResourceModifiedError("UpdateConditionNotSatisfied")
+        self.rows[key] = (dict(entity), next(self.etags))
+
+
+@pytest.mark.parametrize("exists", [False, True])
+def test_bump_creates_the_table_on_first_use(exists):
+    backend = TableVersionBackend(FakeTable(exists=exists))
+    assert backend.read() == 0
+    assert backend.bump() == 1
+    assert backend.bump() == 2
+    assert backend.read() == 2
+
+
+def test_bump_on_a_fresh_deployment_reaches_other_replicas():
+    table = FakeTable()
+    writer, reader = TableVersionBackend(table), CoherenceChecker(TableVersionBackend(table), interval=0)
+    assert reader.check() is False # First check only records the version
+    writer.bump()
+    assert reader.check() is True
+    assert reader.check() is False
+
+
+def test_concurrent_bump_is_retried():
+    table = FakeTable(exists=True)
+    backend = TableVersionBackend(table)
+    backend.bump()
+    real_get = table.get_entity
+
+    def get_then_race(partition_key, row_key):
+        entity = real_get(partition_key, row_key)
+        table.get_entity = real_get
+        TableVersionBackend(table).bump() # Another replica bumps between our read and write
+        return entity
+
+    table.get_entity = get_then_race
+    assert backend.bump() == 3
@@ -0,0 +1,132 @@
+import os
+import re
+import zlib
+from typing import Any, Dict, Iterable, List
+
+try:
+    import zstandard # Optional: faster, smaller compression when installed
+except ImportError:
+    zstandard = None
+
+# --------------------------------------------------------------------------------
+# LARGE-TEXT CODEC (compressed, chunked storage for description / comments)
+# --------------------------------------------------------------------------------
+# Text longer than COMPRESS_ABOVE bytes is stored compressed in binary properties
+# <field>_z0, <field>_z1, ... (each under the 64 KiB property limit). The field
+# itself keeps the first PREVIEW_CHARS characters, so list views and near-duplicate
+# detection (which only reads the start of a description) never decompress. The
+# format is named by <field>_enc ("<codec>:<version>"), so old rows stay readable
+# if the format changes. Short text is stored inline as before, with no _enc.
+LARGE_TEXT_FIELDS = ["description", "comments"]
+COMPRESS_ABOVE = int(os.getenv("TEXT_COMPRESS_ABOVE", "2048")) # UTF-8 bytes
+PREVIEW_CHARS = 300 # Covers dedupe.DESCRIPTION_CHARS
+CHUNK_BYTES = 64000 # Azure Tables: 64 KiB per binary property
+MAX_CHUNKS = 15 # Per entity, all fields together: stays well inside the 1 MiB entity limit
+FORMAT_VERSION = 1
+TEXT_CODEC = os.getenv("TEXT_CODEC", "zlib") # "zlib" (stdlib) or "zstd" (needs zstandard on every replica)
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 9
+_CHUNK_RE = re.compile(r"^(?P<field>\w+?)_z\d+$")
+
+
+class TextTooLargeError(ValueError):
+    """Text that does not fit in an entity even when compressed."""
+
+
+def _compress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("TEXT_CODEC=zstd needs the zstandard package")
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    return zlib.compress(data, ZLIB_LEVEL)
+
+
+def _decompress(data: bytes, encoding: str) -> bytes:
+    codec, _, version = encoding.partition(":")
+    if version != str(FORMAT_VERSION):
+        raise ValueError(f"Unknown text encoding version '{encoding}'")
+    if codec == "zlib":
+        return zlib.decompress(data)
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("Text was stored with zstd; install the zstandard package to read it")
+        return zstandard.ZstdDecompressor().decompress(data)
+    raise ValueError(f"Unknown text codec '{encoding}'")
+
+
+def chunk_columns(field: str) -> List[str]:
+    return [f"{field}_z{i}" for i in range(MAX_CHUNKS)]
+
+
+def stored_columns(fields: Iterable[str] = LARGE_TEXT_FIELDS) -> List[str]:
+    """Every property a large-text field may use, for `select=` lists."""
+    return [c for f in fields for c in [f, f"{f}_enc"] + chunk_columns(f)]
+
+
+def is_encoded(entity: Dict[str, Any], field: str) -> bool:
+    return bool(entity.get(f"{field}_enc"))
+
+
+def _drop_stored(entity: Dict[str, Any], field: str):
+    entity.pop(f"{field}_enc", None)
+    for key in [k for k in entity if (m := _CHUNK_RE.match(k)) and m.group("field") == field]:
+        del entity[key]
+
+
+def encode_entity(entity: Dict[str, Any], fields: Iterable[str] = LARGE_TEXT_FIELDS,
+                  codec: str = TEXT_CODEC) -> Dict[str, Any]:
+    """Returns a copy of the entity with the given plain-text fields compressed if large.
+
+    Stale chunks of those fields are removed, so the result can be written with a
+    REPLACE update. Only pass fields that hold their full text.
+    """
+    out = dict(entity)
+    for field in fields:
+        value = out.get(field)
+        if not isinstance(value, str):
+            continue
+        _drop_stored(out, field)
+        data = value.encode("utf-8")
+        if len(data) <= COMPRESS_ABOVE:
+            continue
+        packed = _compress(data, codec)
+        out[field] = value[:PREVIEW_CHARS]
+        out[f"{field}_enc"] = f"{codec}:{FORMAT_VERSION}"
+        for i in range(0, len(packed), CHUNK_BYTES):
+            out[f"{field}_z{i // CHUNK_BYTES}"] = packed[i:i + CHUNK_BYTES]
+    if sum(1 for k in out if _CHUNK_RE.match(k)) > MAX_CHUNKS:
+        raise TextTooLargeError(f"Text of {out.get('RowKey', 'grievance')} is too long to store, even compressed")
+    return out
+
+
+def decode_field(entity: Dict[str, Any], field: str) -> str:
+    """Full text of a field, decompressing it if it was stored encoded."""
+    encoding = entity.get(f"{field}_enc")
+    if not encoding:
+        value = entity.get(field)
+        return "" if value is None else str(value)
+    chunks = []
+    for column in chunk_columns(field):
+        chunk = entity.get(column)
+        if chunk is None:
+            break
+        chunks.append(bytes(chunk))
+    return _decompress(b"".join(chunks), encoding).decode("utf-8")
+
+
+def decode_entity(entity: Dict[str, Any], fields: Iterable[str] = LARGE_TEXT_FIELDS) -> Dict[str, Any]:
+    """Returns a copy with the fields in plain text and no codec properties (e.g. for the archive)."""
+    out = dict(entity)
+    for field in fields:
+        if is_encoded(out, field):
+            out[field] = decode_field(entity, field)
+        _drop_stored(out, field)
+    return out
+
+
+def decode_entities(entities: Iterable[Dict[str, Any]], fields: Iterable[str] = LARGE_TEXT_FIELDS) -> Iterable[Dict[str, Any]]:
+    """Yields plain-text entities, copying only those that were encoded."""
+    fields = list(fields)
+    for entity in entities:
+        yield decode_entity(entity, fields) if any(is_encoded(entity, f) for f in fields) else entity
+